@@ -1,8 +1,16 @@
 from apispec_starlette.version import __version__
 from apispec_starlette._plugin import StarlettePlugin
-from apispec_starlette._starlette import add_swagger_json_endpoint
+from apispec_starlette._spec import StarletteAPISpec
+from apispec_starlette._shared import FileSpecCache
+from apispec_starlette._docstring_cache import DocstringFileCache
+from apispec_starlette._metrics import SpecMetrics, PrometheusMetrics
+from apispec_starlette._starlette import (
+    add_swagger_json_endpoint,
+    add_swagger_json_file_endpoint,
+)
 from apispec_starlette._helpers import (
     document_response,
+    document_responses,
     document_oauth2_authentication,
     document_endpoint_oauth2_authentication,
 )
@@ -0,0 +1,128 @@
+"""
+Generate the OpenAPI definition of a Starlette application, usually at build time.
+
+    python -m apispec_starlette my_module:app -o swagger.json
+
+The target can either be a Starlette application or the APISpec returned by add_swagger_json_endpoint.
+"""
+
+import argparse
+import importlib
+import os
+import sys
+from typing import List
+
+from apispec.yaml_utils import dict_to_yaml
+from starlette.applications import Starlette
+
+from apispec_starlette._spec import StarletteAPISpec
+
+
+def load(target: str):
+    """
+    Import the object described as module:attribute (attribute default to app).
+    """
+    module_name, _, attribute = target.partition(":")
+    obj = importlib.import_module(module_name)
+    for name in (attribute or "app").split("."):
+        obj = getattr(obj, name)
+    return obj
+
+
+def generate(
+    target,
+    *,
+    title: str = "My API",
+    version: str = "0.0.1",
+    output_format="json",
+    json_encoder: str = None,
+    openapi_version: str = "2.0",
+) -> bytes:
+    """
+    Generate the OpenAPI definition of a Starlette application.
+
+    :param target: Starlette application or StarletteAPISpec instance.
+    :param title: OpenAPI definition title if target is an application. Default to "My API".
+    :param version: OpenAPI definition version if target is an application. Default to "0.0.1".
+    :param output_format: json or yaml. Default to json.
+    :param json_encoder: orjson or json if target is an application. Default to orjson if installed.
+    :param openapi_version: 2.0 (Swagger) or 3 (converted from the 2.0 definition). Default to 2.0.
+    :return: The encoded OpenAPI definition.
+    """
+    if isinstance(target, Starlette):
+        target = StarletteAPISpec(
+            target, title=title, version=version, json_encoder=json_encoder
+        )
+    elif not isinstance(target, StarletteAPISpec):
+        raise TypeError(
+            f"A Starlette application or a StarletteAPISpec is expected, got {type(target).__name__}."
+        )
+
+    if openapi_version == "3":
+        if output_format == "yaml":
+            return dict_to_yaml(target.openapi3()).encode("utf-8")
+        return target.openapi3_serialized().content
+
+    if output_format == "yaml":
+        return dict_to_yaml(target.document()).encode("utf-8")
+    return target.content()
+
+
+def main(args: List[str] = None):
+    parser = argparse.ArgumentParser(
+        prog="python -m apispec_starlette",
+        description="Generate the OpenAPI definition of a Starlette application.",
+    )
+    parser.add_argument(
+        "target",
+        help="Starlette application or APISpec returned by add_swagger_json_endpoint, as module:attribute.",
+    )
+    parser.add_argument(
+        "-o", "--output", help="File to write the definition to. Default to stdout."
+    )
+    parser.add_argument(
+        "-f",
+        "--format",
+        choices=["json", "yaml"],
+        help="Output format. Default to yaml if output file ends with .yaml or .yml, json otherwise.",
+    )
+    parser.add_argument("--title", default="My API", help="Default to My API.")
+    parser.add_argument("--version", default="0.0.1", help="Default to 0.0.1.")
+    parser.add_argument(
+        "--json-encoder",
+        choices=["json", "orjson"],
+        help="Default to orjson if installed, json otherwise.",
+    )
+    parser.add_argument(
+        "--openapi-version",
+        choices=["2.0", "3"],
+        default="2.0",
+        help="Default to 2.0 (Swagger).",
+    )
+    arguments = parser.parse_args(args)
+
+    output_format = arguments.format
+    if not output_format:
+        is_yaml = arguments.output and arguments.output.endswith((".yaml", ".yml"))
+        output_format = "yaml" if is_yaml else "json"
+
+    # Allow to import modules from the current working directory
+    sys.path.insert(0, os.getcwd())
+    definition = generate(
+        load(arguments.target),
+        title=arguments.title,
+        version=arguments.version,
+        output_format=output_format,
+        json_encoder=arguments.json_encoder,
+        openapi_version=arguments.openapi_version,
+    )
+
+    if arguments.output:
+        with open(arguments.output, "wb") as output:
+            output.write(definition)
+    else:
+        sys.stdout.buffer.write(definition)
+
+
+if __name__ == "__main__":
+    main()
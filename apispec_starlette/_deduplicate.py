@@ -0,0 +1,277 @@
+import hashlib
+import json
+from collections import Counter
+from typing import Callable, Dict, Set, Tuple
+
+from apispec_starlette._http import HTTP_METHODS
+
+# Keywords of schemas that are worth sharing (simple schemas such as {"type": "string"} are kept inline)
+_COMPOSITE_SCHEMA_KEYWORDS = ("properties", "items", "allOf", "oneOf", "anyOf")
+
+
+def deduplicate(document: dict, threshold: int) -> Tuple[dict, Set[str]]:
+    """
+    Move inline response and schema objects repeated at least threshold times to components and refer to them instead.
+
+    Objects are only moved if it makes the JSON encoded definition shorter (references and component included).
+    Components are named after a hash of their content so that names are the same across builds and processes.
+    The provided definition is not modified, only the modified parts are copied.
+
+    :return: A tuple containing the resulting definition and the references that were introduced.
+    """
+    openapi_3 = "openapi" in document
+    if openapi_3:
+        schema_prefix, response_prefix = (
+            "#/components/schemas/",
+            "#/components/responses/",
+        )
+    else:
+        schema_prefix, response_prefix = "#/definitions/", "#/responses/"
+
+    paths = document.get("paths", {})
+    hashes = {}
+
+    def hashed(value: dict) -> tuple:
+        key = id(value)
+        if key not in hashes:
+            encoded = json.dumps(value, sort_keys=True, default=str).encode("utf-8")
+            compact = json.dumps(
+                value, ensure_ascii=False, separators=(",", ":"), default=str
+            ).encode("utf-8")
+            # Keep a reference to the value so that its identifier is not reused meanwhile
+            hashes[key] = (
+                hashlib.blake2b(encoded, digest_size=8).hexdigest(),
+                len(compact),
+                value,
+            )
+        return hashes[key]
+
+    def digest(value: dict) -> str:
+        return hashed(value)[0]
+
+    def size(value: dict) -> int:
+        return hashed(value)[1]
+
+    # Schemas are replaced first so that responses only differing by their schema description can be shared
+    schemas = _repeated(
+        paths,
+        _schemas_of,
+        _is_composite_schema,
+        digest,
+        threshold,
+        lambda value, count: _saves_bytes(size(value), count, f"{schema_prefix}Schema"),
+    )
+    shared_schemas = {}
+
+    def share_schema(schema: dict) -> dict:
+        if not _is_composite_schema(schema) or digest(schema) not in schemas:
+            return schema
+        name = f"Schema{digest(schema)}"
+        shared_schemas[name] = schema
+        return {"$ref": f"{schema_prefix}{name}"}
+
+    paths = _map_operations(
+        paths, lambda operation: _map_schemas(operation, share_schema)
+    )
+
+    responses = _repeated(
+        paths,
+        _responses_of,
+        _is_inline,
+        digest,
+        threshold,
+        lambda value, count: _saves_bytes(
+            size(value), count, f"{response_prefix}Response"
+        ),
+    )
+    shared_responses = {}
+
+    def share_response(response: dict) -> dict:
+        if not _is_inline(response) or digest(response) not in responses:
+            return response
+        name = f"Response{digest(response)}"
+        shared_responses[name] = response
+        return {"$ref": f"{response_prefix}{name}"}
+
+    paths = _map_operations(
+        paths, lambda operation: _map_responses(operation, share_response)
+    )
+
+    if not shared_schemas and not shared_responses:
+        return document, set()
+
+    document = {**document, "paths": paths}
+    if openapi_3:
+        components = dict(document.get("components", {}))
+        _add_components(components, "schemas", shared_schemas)
+        _add_components(components, "responses", shared_responses)
+        document["components"] = components
+    else:
+        _add_components(document, "definitions", shared_schemas)
+        _add_components(document, "responses", shared_responses)
+
+    references = {f"{schema_prefix}{name}" for name in shared_schemas}
+    references.update(f"{response_prefix}{name}" for name in shared_responses)
+    return document, references
+
+
+def _saves_bytes(size: int, occurrences: int, reference_prefix: str) -> bool:
+    """
+    Return True if referring to a component (named after a hash) is shorter than repeating the object inline.
+
+    :param size: Size of the JSON encoded object.
+    :param reference_prefix: Reference to the component, without the hash (16 hexadecimal characters).
+    """
+    # {"$ref":"<reference>"}
+    reference = len(reference_prefix) + 16 + 11
+    # "<name>":<object>, (name being the last part of the reference)
+    component = len(reference_prefix.rsplit("/", 1)[1]) + 16 + 4 + size
+    return occurrences * size > occurrences * reference + component
+
+
+def _is_inline(value) -> bool:
+    return isinstance(value, dict) and "$ref" not in value
+
+
+def _is_composite_schema(value) -> bool:
+    return _is_inline(value) and any(
+        keyword in value for keyword in _COMPOSITE_SCHEMA_KEYWORDS
+    )
+
+
+def _add_components(container: dict, section: str, components: Dict[str, dict]):
+    if components:
+        container[section] = {**container.get(section, {}), **components}
+
+
+def _operations(paths: dict):
+    for path_item in paths.values():
+        for method, operation in path_item.items():
+            if method in HTTP_METHODS and isinstance(operation, dict):
+                yield operation
+
+
+def _repeated(
+    paths: dict,
+    values_of: Callable,
+    is_candidate: Callable,
+    digest: Callable,
+    threshold: int,
+    saves_bytes: Callable,
+) -> Set[str]:
+    occurrences = Counter()
+    # An occurrence of each value, per digest
+    values = {}
+    for operation in _operations(paths):
+        for value in values_of(operation):
+            if is_candidate(value):
+                key = digest(value)
+                occurrences[key] += 1
+                values.setdefault(key, value)
+    return {
+        key
+        for key, count in occurrences.items()
+        if count >= threshold and saves_bytes(values[key], count)
+    }
+
+
+def _responses_of(operation: dict):
+    responses = operation.get("responses")
+    return responses.values() if isinstance(responses, dict) else ()
+
+
+def _schemas_of(operation: dict):
+    for response in _responses_of(operation):
+        if isinstance(response, dict):
+            yield response.get("schema")
+            yield from _content_schemas(response)
+    for parameter in operation.get("parameters") or []:
+        if isinstance(parameter, dict):
+            yield parameter.get("schema")
+    request_body = operation.get("requestBody")
+    if isinstance(request_body, dict):
+        yield from _content_schemas(request_body)
+
+
+def _content_schemas(holder: dict):
+    for media_type in (holder.get("content") or {}).values():
+        if isinstance(media_type, dict):
+            yield media_type.get("schema")
+
+
+def _map_operations(paths: dict, map_operation: Callable[[dict], dict]) -> dict:
+    new_paths = {}
+    for path, path_item in paths.items():
+        new_path_item = {
+            method: (
+                map_operation(operation)
+                if method in HTTP_METHODS and isinstance(operation, dict)
+                else operation
+            )
+            for method, operation in path_item.items()
+        }
+        new_paths[path] = _unless_unchanged(path_item, new_path_item)
+    return new_paths
+
+
+def _unless_unchanged(previous: dict, new: dict) -> dict:
+    """
+    Return previous if every value of new is identical (so that unchanged parts are shared).
+    """
+    if all(new[key] is previous[key] for key in previous):
+        return previous
+    return new
+
+
+def _map_responses(operation: dict, map_response: Callable[[dict], dict]) -> dict:
+    responses = operation.get("responses")
+    if not isinstance(responses, dict):
+        return operation
+    new_responses = {
+        status: map_response(response) for status, response in responses.items()
+    }
+    new_responses = _unless_unchanged(responses, new_responses)
+    if new_responses is responses:
+        return operation
+    return {**operation, "responses": new_responses}
+
+
+def _map_schema_holder(holder, map_schema: Callable[[dict], dict]):
+    if not isinstance(holder, dict):
+        return holder
+    new_holder = holder
+    if "schema" in holder:
+        schema = map_schema(holder["schema"])
+        if schema is not holder["schema"]:
+            new_holder = {**holder, "schema": schema}
+    content = holder.get("content")
+    if isinstance(content, dict):
+        new_content = _unless_unchanged(
+            content,
+            {
+                media: _map_schema_holder(media_type, map_schema)
+                for media, media_type in content.items()
+            },
+        )
+        if new_content is not content:
+            new_holder = {**new_holder, "content": new_content}
+    return new_holder
+
+
+def _map_schemas(operation: dict, map_schema: Callable[[dict], dict]) -> dict:
+    new_operation = _map_responses(
+        operation, lambda response: _map_schema_holder(response, map_schema)
+    )
+    parameters = operation.get("parameters")
+    if isinstance(parameters, list):
+        new_parameters = [
+            _map_schema_holder(parameter, map_schema) for parameter in parameters
+        ]
+        if any(new is not old for new, old in zip(new_parameters, parameters)):
+            new_operation = {**new_operation, "parameters": new_parameters}
+    request_body = operation.get("requestBody")
+    if isinstance(request_body, dict):
+        new_request_body = _map_schema_holder(request_body, map_schema)
+        if new_request_body is not request_body:
+            new_operation = {**new_operation, "requestBody": new_request_body}
+    return new_operation
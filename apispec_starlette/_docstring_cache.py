@@ -0,0 +1,107 @@
+import hashlib
+import marshal
+import os
+import sys
+import tempfile
+from typing import Any, Optional, Tuple
+
+
+class DocstringFileCache:
+    """
+    Keep parsed docstrings in a local directory (similar to __pycache__) so that new processes do not parse YAML.
+
+    Entries are identified by a hash of the docstring (and of the Python implementation, as marshal is used).
+    Multiple processes can safely use the same directory.
+    """
+
+    def __init__(self, directory: str, *, max_entries: int = 10000):
+        """
+        :param directory: Directory where parsed docstrings are stored. Created if it does not exist.
+        :param max_entries: Maximum number of parsed docstrings to store.
+        Oldest entries are removed once exceeded. Default to 10000.
+        """
+        self.directory = directory
+        self.max_entries = max_entries
+        os.makedirs(directory, exist_ok=True)
+        # Approximation as other processes might add entries meanwhile
+        self._entries = sum(
+            1 for name in os.listdir(directory) if name.endswith(".marshal")
+        )
+
+    def _path(self, docstring: str) -> str:
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(sys.implementation.cache_tag.encode("utf-8"))
+        digest.update(docstring.encode("utf-8"))
+        return os.path.join(self.directory, f"{digest.hexdigest()}.marshal")
+
+    def get(self, docstring: str) -> Optional[Tuple[Any, dict]]:
+        """
+        Return the parsed docstring or None if not stored.
+        """
+        try:
+            with open(self._path(docstring), "rb") as file:
+                parsed = marshal.load(file)
+        except (OSError, EOFError, ValueError, TypeError):
+            return None
+
+        # Ensure file content was stored by this cache
+        if isinstance(parsed, tuple) and len(parsed) == 2:
+            return parsed
+
+    def put(self, docstring: str, parsed: Tuple[Any, dict]):
+        """
+        Store the parsed docstring, unless it contains types that cannot be stored (such as dates).
+
+        Failing to store it (such as a read-only or full disk) is ignored, as the cache is optional.
+        """
+        try:
+            content = marshal.dumps(parsed)
+        except ValueError:
+            return
+
+        temporary_path = None
+        try:
+            file_descriptor, temporary_path = tempfile.mkstemp(
+                dir=self.directory, suffix=".tmp"
+            )
+            with os.fdopen(file_descriptor, "wb") as file:
+                file.write(content)
+            # Readers will either see no file or the full content
+            os.replace(temporary_path, self._path(docstring))
+        except OSError:
+            if temporary_path is not None:
+                try:
+                    os.remove(temporary_path)
+                except OSError:  # pragma: no cover
+                    pass
+            return
+
+        self._entries += 1
+        if self._entries > self.max_entries:
+            self._prune()
+
+    def _prune(self):
+        """
+        Remove oldest entries so that only 90% of max_entries remain.
+        """
+        paths = [
+            os.path.join(self.directory, name)
+            for name in os.listdir(self.directory)
+            if name.endswith(".marshal")
+        ]
+        paths.sort(key=_modification_time)
+        to_remove = len(paths) - int(self.max_entries * 0.9)
+        for path in paths[: max(to_remove, 0)]:
+            try:
+                os.remove(path)
+            except OSError:  # pragma: no cover
+                # Removed by another process (or cannot be removed)
+                pass
+        self._entries = len(paths) - max(to_remove, 0)
+
+
+def _modification_time(path: str) -> float:
+    try:
+        return os.path.getmtime(path)
+    except FileNotFoundError:  # pragma: no cover
+        return 0.0
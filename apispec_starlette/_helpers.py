@@ -1,7 +1,12 @@
-from typing import List, Dict
+import json
+import os
+from typing import List, Dict, Union, Iterable, Mapping
 
 from apispec import APISpec
 
+from apispec_starlette._plugin import _yaml_loader
+from apispec_starlette._spec import StarletteAPISpec
+
 
 def document_response(
     spec: APISpec, *, endpoint: str, method: str, status_code: int, response: dict
@@ -12,15 +17,79 @@ def document_response(
     )
 
 
+def document_responses(
+    spec: APISpec,
+    responses: Union[Iterable[dict], Mapping[str, dict], str, os.PathLike],
+):
+    """
+    Document many responses at once. Responses are merged first and each path is then documented only once.
+
+    :param responses: Either:
+        * an iterable of dictionaries with endpoint, method, status_code and response keys (see document_response),
+        * a mapping of endpoint to method to status code to response,
+        * the path to a JSON (.json extension) or YAML file containing such a mapping.
+    """
+    if isinstance(responses, (str, os.PathLike)):
+        responses = _load(responses)
+
+    if isinstance(responses, Mapping):
+        responses = (
+            {
+                "endpoint": endpoint,
+                "method": method,
+                "status_code": status_code,
+                "response": response,
+            }
+            for endpoint, methods in responses.items()
+            for method, status_codes in methods.items()
+            for status_code, response in status_codes.items()
+        )
+
+    operations = {}
+    for entry in responses:
+        operations.setdefault(entry["endpoint"], {}).setdefault(
+            entry["method"].lower(), {"responses": {}}
+        )["responses"][str(entry["status_code"])] = entry["response"]
+
+    if isinstance(spec, StarletteAPISpec):
+        with spec.lock:
+            for endpoint, endpoint_operations in operations.items():
+                spec._document_path(endpoint, operations=endpoint_operations)
+            # Definition might already be built
+            spec.invalidate()
+    else:
+        for endpoint, endpoint_operations in operations.items():
+            spec.path(endpoint, operations=endpoint_operations)
+
+
+def _load(file_path: Union[str, os.PathLike]) -> dict:
+    with open(file_path, encoding="utf-8") as file:
+        if os.fspath(file_path).endswith(".json"):
+            return json.load(file)
+        yaml, loader = _yaml_loader()
+        return yaml.load(file, Loader=loader)
+
+
 def document_oauth2_authentication(
     spec: APISpec, *, authorization_url: str, flow: str, scopes: Dict[str, str]
 ):
-    spec.options.setdefault("securityDefinitions", {})["oauth2"] = {
+    security_definition = {
         "scopes": scopes,
         "flow": flow,
         "authorizationUrl": authorization_url,
         "type": "oauth2",
     }
+    if isinstance(spec, StarletteAPISpec):
+        with spec.lock:
+            spec.options.setdefault("securityDefinitions", {})[
+                "oauth2"
+            ] = security_definition
+            # Definition might already be built
+            spec.invalidate()
+    else:
+        spec.options.setdefault("securityDefinitions", {})[
+            "oauth2"
+        ] = security_definition
 
 
 def document_endpoint_oauth2_authentication(
@@ -0,0 +1,2 @@
+# Keys of a path item that are operations (HTTP methods supported by OpenAPI)
+HTTP_METHODS = ("get", "put", "post", "delete", "options", "head", "patch", "trace")
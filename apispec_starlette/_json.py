@@ -0,0 +1,45 @@
+import json
+from typing import Any, Callable, Union
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def stdlib_dumps(obj: Any) -> bytes:
+    # Same encoding as starlette.responses.JSONResponse
+    return json.dumps(
+        obj, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def orjson_dumps(obj: Any) -> bytes:
+    # Status codes are used as keys (as int) in responses
+    return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+
+
+def json_encoder(encoder: Union[str, Callable[[Any], bytes], None]) -> Callable:
+    """
+    Return the function to use to encode JSON.
+
+    :param encoder: "orjson", "json" (standard library), a function returning encoded bytes,
+    or None to use orjson if installed and standard library otherwise.
+    """
+    if callable(encoder):
+        return encoder
+
+    if encoder is None:
+        return orjson_dumps if orjson else stdlib_dumps
+
+    if encoder == "json":
+        return stdlib_dumps
+
+    if encoder == "orjson":
+        if not orjson:
+            raise ImportError("orjson must be installed to be used as JSON encoder.")
+        return orjson_dumps
+
+    raise ValueError(
+        f"{encoder} is not a valid JSON encoder. Valid values are json and orjson."
+    )
@@ -0,0 +1,81 @@
+import threading
+from typing import Dict
+
+
+class SpecMetrics:
+    """
+    Receive measures of OpenAPI definition build phases. Override observe to forward them to your metrics system.
+
+    Phases are:
+        * discover_routes: Retrieval of new application endpoints (routes count).
+        * init_spec: Documentation of exception handlers (exception_handlers count).
+        * parse_docstrings: Docstrings parsing, cumulated per build (docstrings and cache_hits counts).
+        * merge: Merge of documented operations into endpoints operations, cumulated per build (operations count).
+        * to_dict: Generation of the definition as a dictionary (paths count).
+        * deduplicate: Replacement of repeated responses and schemas by references (references count).
+        * serialize: JSON encoding of the definition (bytes count).
+    """
+
+    def observe(self, phase: str, duration: float, **counts: int):
+        """
+        :param phase: Name of the phase.
+        :param duration: Time spent in this phase (in seconds).
+        :param counts: Number of items processed during this phase, per kind of item.
+        """
+
+
+class PrometheusMetrics(SpecMetrics):
+    """
+    Aggregate measures so that they can be exposed in Prometheus text format (see render).
+    """
+
+    def __init__(self, prefix: str = "apispec_starlette"):
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._observations: Dict[str, int] = {}
+        self._durations: Dict[str, float] = {}
+        self._last_durations: Dict[str, float] = {}
+        self._counts: Dict[tuple, int] = {}
+
+    def observe(self, phase: str, duration: float, **counts: int):
+        with self._lock:
+            self._observations[phase] = self._observations.get(phase, 0) + 1
+            self._durations[phase] = self._durations.get(phase, 0.0) + duration
+            self._last_durations[phase] = duration
+            for item, count in counts.items():
+                self._counts[(phase, item)] = self._counts.get((phase, item), 0) + count
+
+    def render(self) -> str:
+        """
+        Return aggregated measures in Prometheus text exposition format.
+        """
+        prefix = self.prefix
+        with self._lock:
+            lines = [
+                f"# HELP {prefix}_phase_duration_seconds Time spent building the OpenAPI definition, per phase.",
+                f"# TYPE {prefix}_phase_duration_seconds summary",
+            ]
+            for phase, observations in self._observations.items():
+                lines.append(
+                    f'{prefix}_phase_duration_seconds_count{{phase="{phase}"}} {observations}'
+                )
+                lines.append(
+                    f'{prefix}_phase_duration_seconds_sum{{phase="{phase}"}} {self._durations[phase]}'
+                )
+            lines += [
+                f"# HELP {prefix}_phase_last_duration_seconds Time spent during the last occurrence of a phase.",
+                f"# TYPE {prefix}_phase_last_duration_seconds gauge",
+            ]
+            for phase, duration in self._last_durations.items():
+                lines.append(
+                    f'{prefix}_phase_last_duration_seconds{{phase="{phase}"}} {duration}'
+                )
+            lines += [
+                f"# HELP {prefix}_phase_items_total Number of items processed, per phase and kind of item.",
+                f"# TYPE {prefix}_phase_items_total counter",
+            ]
+            for (phase, item), count in self._counts.items():
+                lines.append(
+                    f'{prefix}_phase_items_total{{phase="{phase}",item="{item}"}} {count}'
+                )
+        return "\n".join(lines) + "\n"
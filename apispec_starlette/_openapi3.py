@@ -0,0 +1,352 @@
+from typing import Any, List
+
+from apispec_starlette._http import HTTP_METHODS
+
+OPENAPI_3_VERSION = "3.0.2"
+
+# Swagger 2.0 reference prefixes and their OpenAPI 3 equivalent
+_REFERENCES = {
+    "#/definitions/": "#/components/schemas/",
+    "#/responses/": "#/components/responses/",
+    "#/parameters/": "#/components/parameters/",
+}
+
+_PARAMETERS_REFERENCE = "#/components/parameters/"
+_REQUEST_BODIES_REFERENCE = "#/components/requestBodies/"
+
+# Locations of parameters describing the request body (converted to requestBody in OpenAPI 3)
+_BODY_LOCATIONS = ("body", "formData")
+
+# Parameter fields describing the parameter value (moved to schema in OpenAPI 3)
+_SCHEMA_FIELDS = (
+    "type",
+    "format",
+    "items",
+    "collectionFormat",
+    "default",
+    "maximum",
+    "exclusiveMaximum",
+    "minimum",
+    "exclusiveMinimum",
+    "maxLength",
+    "minLength",
+    "pattern",
+    "maxItems",
+    "minItems",
+    "uniqueItems",
+    "enum",
+    "multipleOf",
+)
+
+# Swagger 2.0 OAuth2 flows and their OpenAPI 3 name
+_OAUTH2_FLOWS = {
+    "implicit": "implicit",
+    "password": "password",
+    "application": "clientCredentials",
+    "accessCode": "authorizationCode",
+}
+
+_DEFAULT_MEDIA_TYPES = ["application/json"]
+
+
+def to_openapi3(document: dict) -> dict:
+    """
+    Convert a Swagger 2.0 definition (as built by StarletteAPISpec) to an OpenAPI 3 definition.
+
+    The provided definition is not modified. Definitions that are already OpenAPI 3 are returned as is.
+    """
+    if "openapi" in document:
+        return document
+
+    document = _references(document)
+    consumes = document.get("consumes", _DEFAULT_MEDIA_TYPES)
+    produces = document.get("produces", _DEFAULT_MEDIA_TYPES)
+    parameters = document.get("parameters", {})
+
+    converted = {"openapi": OPENAPI_3_VERSION}
+    components = {}
+    for key, value in document.items():
+        if key in ("swagger", "consumes", "produces", "schemes", "host", "basePath"):
+            continue
+        if key == "paths":
+            converted["paths"] = {
+                path: _path_item(path_item, consumes, produces, parameters)
+                for path, path_item in value.items()
+            }
+        elif key == "definitions":
+            components["schemas"] = value
+        elif key == "responses":
+            components["responses"] = {
+                name: _response(response, produces) for name, response in value.items()
+            }
+        elif key == "parameters":
+            _parameter_components(value, consumes, components)
+        elif key == "securityDefinitions":
+            components["securitySchemes"] = {
+                name: _security_scheme(scheme) for name, scheme in value.items()
+            }
+        else:
+            converted[key] = value
+
+    servers = _servers(document)
+    if servers:
+        converted["servers"] = servers
+    if components:
+        converted["components"] = components
+    return converted
+
+
+def _references(value: Any) -> Any:
+    """
+    Return value with Swagger 2.0 references replaced by OpenAPI 3 ones (only modified parts are copied).
+    """
+    if isinstance(value, dict):
+        converted = {key: _references(item) for key, item in value.items()}
+        reference = converted.get("$ref")
+        if isinstance(reference, str):
+            for prefix, openapi3_prefix in _REFERENCES.items():
+                if reference.startswith(prefix):
+                    converted["$ref"] = openapi3_prefix + reference[len(prefix) :]
+        if all(converted[key] is value[key] for key in value):
+            return value
+        return converted
+    if isinstance(value, list):
+        converted = [_references(item) for item in value]
+        if all(new is old for new, old in zip(converted, value)):
+            return value
+        return converted
+    return value
+
+
+def _servers(document: dict) -> List[dict]:
+    host, base_path = document.get("host"), document.get("basePath")
+    if not host and not base_path:
+        return []
+    if not host:
+        return [{"url": base_path}]
+    return [
+        {"url": f"{scheme}://{host}{base_path or ''}"}
+        for scheme in document.get("schemes", ["http"])
+    ]
+
+
+def _path_item(
+    path_item: dict, consumes: List[str], produces: List[str], parameters: dict
+) -> dict:
+    # Request body can only be described per operation in OpenAPI 3
+    body_parameters = [
+        parameter
+        for parameter in path_item.get("parameters", [])
+        if _resolved(parameter, parameters).get("in") in _BODY_LOCATIONS
+    ]
+    converted = {}
+    for key, value in path_item.items():
+        if key in HTTP_METHODS:
+            converted[key] = _operation(
+                value, consumes, produces, parameters, body_parameters
+            )
+        elif key == "parameters":
+            path_parameters = [
+                _parameter(parameter)
+                for parameter in value
+                if parameter not in body_parameters
+            ]
+            if path_parameters:
+                converted[key] = path_parameters
+        else:
+            converted[key] = value
+    return converted
+
+
+def _resolved(parameter: dict, parameters: dict) -> dict:
+    """
+    Return the parameter component referred to (if any), the parameter otherwise.
+    """
+    reference = parameter.get("$ref")
+    if isinstance(reference, str) and reference.startswith(_PARAMETERS_REFERENCE):
+        return parameters.get(reference[len(_PARAMETERS_REFERENCE) :], parameter)
+    return parameter
+
+
+def _identity(parameter: dict) -> tuple:
+    # There can only be one body parameter, whatever its name
+    location = parameter.get("in")
+    return location, None if location == "body" else parameter.get("name")
+
+
+def _operation(
+    operation: dict,
+    consumes: List[str],
+    produces: List[str],
+    parameters: dict,
+    path_body_parameters: List[dict] = (),
+) -> dict:
+    consumes = operation.get("consumes", consumes)
+    produces = operation.get("produces", produces)
+    converted = {}
+    for key, value in operation.items():
+        if key in ("consumes", "produces", "schemes", "parameters"):
+            continue
+        if key == "responses":
+            converted["responses"] = {
+                status: _response(response, produces)
+                for status, response in value.items()
+            }
+        else:
+            converted[key] = value
+
+    operation_parameters = operation.get("parameters", [])
+    # Operation parameters override path ones
+    overridden = {
+        _identity(_resolved(parameter, parameters))
+        for parameter in operation_parameters
+    }
+    inherited = [
+        parameter
+        for parameter in path_body_parameters
+        if _identity(_resolved(parameter, parameters)) not in overridden
+    ]
+    converted_parameters = []
+    form_parameters = []
+    for parameter in inherited + list(operation_parameters):
+        resolved = _resolved(parameter, parameters)
+        location = resolved.get("in")
+        if location == "body":
+            converted["requestBody"] = (
+                {
+                    "$ref": _REQUEST_BODIES_REFERENCE
+                    + parameter["$ref"][len(_PARAMETERS_REFERENCE) :]
+                }
+                if resolved is not parameter
+                else _request_body(parameter, consumes)
+            )
+        elif location == "formData":
+            form_parameters.append(resolved)
+        else:
+            converted_parameters.append(_parameter(parameter))
+
+    if converted_parameters:
+        converted["parameters"] = converted_parameters
+    if form_parameters:
+        converted["requestBody"] = _form_request_body(form_parameters, consumes)
+    return converted
+
+
+def _parameter(parameter: dict) -> dict:
+    if "$ref" in parameter:
+        return parameter
+    converted = _with_schema(parameter)
+    if parameter.get("collectionFormat") == "multi":
+        converted.update(style="form", explode=True)
+    return converted
+
+
+def _with_schema(value: dict) -> dict:
+    """
+    Move fields describing the value of a parameter (or header) to its schema.
+    """
+    converted = {key: item for key, item in value.items() if key not in _SCHEMA_FIELDS}
+    schema = {
+        key: item
+        for key, item in value.items()
+        if key in _SCHEMA_FIELDS and key != "collectionFormat"
+    }
+    if schema:
+        converted["schema"] = schema
+    return converted
+
+
+def _request_body(parameter: dict, consumes: List[str]) -> dict:
+    request_body = {
+        "content": {
+            media_type: {"schema": parameter.get("schema", {})}
+            for media_type in consumes
+        }
+    }
+    if "description" in parameter:
+        request_body["description"] = parameter["description"]
+    if parameter.get("required"):
+        request_body["required"] = True
+    return request_body
+
+
+def _form_request_body(parameters: List[dict], consumes: List[str]) -> dict:
+    schema = {"type": "object", "properties": {}}
+    for parameter in parameters:
+        property_schema = _parameter(parameter).get("schema", {})
+        if "description" in parameter:
+            property_schema = {
+                **property_schema,
+                "description": parameter["description"],
+            }
+        schema["properties"][parameter["name"]] = property_schema
+        if parameter.get("required"):
+            schema.setdefault("required", []).append(parameter["name"])
+
+    form_media_types = [
+        media_type
+        for media_type in consumes
+        if media_type in ("application/x-www-form-urlencoded", "multipart/form-data")
+    ] or ["application/x-www-form-urlencoded"]
+    return {
+        "content": {media_type: {"schema": schema} for media_type in form_media_types}
+    }
+
+
+def _parameter_components(parameters: dict, consumes: List[str], components: dict):
+    for name, parameter in parameters.items():
+        location = parameter.get("in")
+        if location == "body":
+            components.setdefault("requestBodies", {})[name] = _request_body(
+                parameter, consumes
+            )
+        elif location == "formData":
+            # Form parameters are part of the request body of operations referring to them
+            continue
+        else:
+            components.setdefault("parameters", {})[name] = _parameter(parameter)
+
+
+def _response(response: dict, produces: List[str]) -> dict:
+    if "$ref" in response:
+        return response
+    converted = {
+        key: value
+        for key, value in response.items()
+        if key not in ("schema", "examples", "headers")
+    }
+    if "schema" in response:
+        examples = response.get("examples", {})
+        converted["content"] = {
+            media_type: (
+                {"schema": response["schema"], "example": examples[media_type]}
+                if media_type in examples
+                else {"schema": response["schema"]}
+            )
+            for media_type in produces
+        }
+    if "headers" in response:
+        converted["headers"] = {
+            name: _with_schema(header) for name, header in response["headers"].items()
+        }
+    return converted
+
+
+def _security_scheme(scheme: dict) -> dict:
+    scheme_type = scheme.get("type")
+    if scheme_type == "basic":
+        converted = {"type": "http", "scheme": "basic"}
+    elif scheme_type == "oauth2":
+        flow = {"scopes": scheme.get("scopes", {})}
+        for key in ("authorizationUrl", "tokenUrl"):
+            if key in scheme:
+                flow[key] = scheme[key]
+        converted = {
+            "type": "oauth2",
+            "flows": {_OAUTH2_FLOWS.get(scheme.get("flow"), scheme.get("flow")): flow},
+        }
+    else:
+        converted = {key: value for key, value in scheme.items() if key != "flow"}
+    if "description" in scheme:
+        converted["description"] = scheme["description"]
+    return converted
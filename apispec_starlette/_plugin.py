@@ -1,9 +1,96 @@
-from typing import List, Callable, Optional, Union, Type
+import copy
+import functools
+import hashlib
+import time
+from typing import (
+    List,
+    Callable,
+    Optional,
+    Union,
+    Type,
+    Tuple,
+    Any,
+    Iterable,
+    Mapping,
+    TYPE_CHECKING,
+)
 
-import yaml
 from apispec import BasePlugin, APISpec
 from starlette.applications import Starlette
-from starlette.schemas import BaseSchemaGenerator, EndpointInfo
+from starlette.routing import BaseRoute, Match, Mount, compile_path
+
+from apispec_starlette._docstring_cache import DocstringFileCache
+from apispec_starlette._metrics import SpecMetrics
+
+# yaml (and starlette.schemas which imports it) are only imported once needed, to keep import time low
+if TYPE_CHECKING:  # pragma: no cover
+    from starlette.schemas import BaseSchemaGenerator, EndpointInfo
+
+
+@functools.lru_cache(maxsize=None)
+def _yaml_loader():
+    import yaml
+
+    # Use libyaml bindings if available as they are way faster than the pure python parser
+    return yaml, getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+
+# Maximum number of distinct docstrings to keep parsed
+DOCSTRING_CACHE_SIZE = 4096
+
+
+@functools.lru_cache(maxsize=DOCSTRING_CACHE_SIZE)
+def _parse_docstring(
+    docstring: str, persistent_cache: DocstringFileCache = None
+) -> Tuple[Any, dict]:
+    """
+    Parse a docstring as YAML (unless already parsed in persistent cache).
+
+    We support having regular docstrings before the schema definition (separated by ---).
+
+    :return: A tuple containing the summary (if the first part is not YAML) and the schema (if the last part is YAML).
+    """
+    if persistent_cache is None:
+        return _parse_yaml_docstring(docstring)
+
+    parsed = persistent_cache.get(docstring)
+    if parsed is None:
+        parsed = _parse_yaml_docstring(docstring)
+        persistent_cache.put(docstring, parsed)
+    return parsed
+
+
+def _parse_yaml_docstring(docstring: str) -> Tuple[Any, dict]:
+    yaml, loader = _yaml_loader()
+    parts = docstring.split("---")
+    summary = yaml.load(parts[0], Loader=loader)
+    if len(parts) == 1:
+        schema = summary
+    else:
+        schema = yaml.load(parts[-1], Loader=loader)
+
+    return (
+        None if isinstance(summary, dict) else summary,
+        schema if isinstance(schema, dict) else {},
+    )
+
+
+def parse_docstring(
+    func_or_method: Callable, persistent_cache: DocstringFileCache = None
+) -> Tuple[Any, dict]:
+    """
+    Given a function, return the summary and the schema described in its docstring.
+
+    Docstrings are only parsed once, the returned schema is a copy that can be safely modified.
+
+    :param persistent_cache: Cache to use to retrieve (and store) parsed docstrings across processes.
+    """
+    docstring = func_or_method.__doc__
+    if not docstring:
+        return None, {}
+
+    summary, schema = _parse_docstring(docstring, persistent_cache)
+    return summary, copy.deepcopy(schema)
 
 
 def extract_status_code(
@@ -30,19 +117,51 @@ class StarlettePlugin(BasePlugin):
         * The exception handler contains a YAML docstring describing the content of the response.
         * A status code is provided, either as the key when registering the exception handler or as the single key
         in the YAML docstring of the handler.
+
+    Routes are tracked (by identity) so that new_endpoints only returns endpoints that were not yet documented.
+
+    Parsed docstrings can be stored on disk (docstring_cache) so that other processes do not have to parse them.
+
+    Build phases are measured if metrics are provided (docstrings parsing and merge are reported by report_metrics).
     """
 
-    def __init__(self, app: Starlette):
+    def __init__(
+        self,
+        app: Starlette,
+        docstring_cache: DocstringFileCache = None,
+        metrics: SpecMetrics = None,
+    ):
         self.operations = {}
-        self.generator = BaseSchemaGenerator()
+        self.docstring_cache = docstring_cache
+        self.metrics = metrics
+        # Cumulated measures of docstrings parsing and merge since last report
+        self._parsing = [0.0, 0, 0]  # duration, docstrings, cache hits
+        self._merging = [0.0, 0]  # duration, operations
+        self._generator = None
         self.app = app
+        # Fingerprint of the routes as of last call to new_endpoints
+        self._routes_fingerprint = None
+        # Documented routes (with the route as first item to keep its identity unique)
+        self._documented_routes = {}
+        # Documented endpoints per path
+        self._documented_endpoints = {}
+        # Paths that were documented (using spec.path) since last call to new_endpoints
+        self._modified_paths = set()
+        # Route (and its mount prefix) of each endpoint returned by new_endpoints (per endpoint identity)
+        self._endpoint_routes = {}
+        # Documented operation per (route identity or route name) and HTTP method, and
+        # (route, mount prefix, documented operation) of every route per (endpoint identity, HTTP method)
+        self._route_operations = {}
+        # Copy of _route_operations updated by path_helper until publish_operations is called
+        self._indexing = None
 
     def init_spec(self, spec: APISpec):
         # TODO Document error 500
+        start = time.perf_counter()
 
         # Document all responses that can occur in case of an error
         for status_code_or_exception, handler in self.app.exception_handlers.items():
-            handler_component = self.generator.parse_docstring(handler)
+            _, handler_component = self._parse(handler)
             status_code, handler_component = extract_status_code(
                 status_code_or_exception, handler_component
             )
@@ -51,71 +170,339 @@ class StarlettePlugin(BasePlugin):
                     name=f"Error{status_code}", component=handler_component
                 )
                 spec.components.response(
-                    status_code,
-                    {"schema": {"$ref": f"#/definitions/Error{status_code}"}},
+                    status_code, _error_response(spec, f"Error{status_code}")
                 )
 
-    def endpoints(self) -> List[EndpointInfo]:
+        if self.metrics:
+            self.metrics.observe(
+                "init_spec",
+                time.perf_counter() - start,
+                exception_handlers=len(self.app.exception_handlers),
+            )
+            self.report_metrics()
+
+    def _parse(self, func_or_method: Callable) -> Tuple[Any, dict]:
+        if not self.metrics:
+            return parse_docstring(func_or_method, self.docstring_cache)
+
+        hits = _parse_docstring.cache_info().hits
+        start = time.perf_counter()
+        parsed = parse_docstring(func_or_method, self.docstring_cache)
+        self._parsing[0] += time.perf_counter() - start
+        self._parsing[1] += 1
+        self._parsing[2] += _parse_docstring.cache_info().hits - hits
+        return parsed
+
+    def _merge(self, previous: dict, new: dict) -> dict:
+        if not self.metrics:
+            return merge_dict(previous, new)
+
+        start = time.perf_counter()
+        merged = merge_dict(previous, new)
+        self._merging[0] += time.perf_counter() - start
+        self._merging[1] += 1
+        return merged
+
+    def report_metrics(self):
+        """
+        Report docstrings parsing and merge measures cumulated since last report (if any).
+        """
+        if not self.metrics:
+            return
+        duration, docstrings, cache_hits = self._parsing
+        if docstrings:
+            self.metrics.observe(
+                "parse_docstrings",
+                duration,
+                docstrings=docstrings,
+                cache_hits=cache_hits,
+            )
+        duration, operations = self._merging
+        if operations:
+            self.metrics.observe("merge", duration, operations=operations)
+        self._parsing = [0.0, 0, 0]
+        self._merging = [0.0, 0]
+
+    @property
+    def generator(self) -> "BaseSchemaGenerator":
+        if self._generator is None:
+            from starlette.schemas import BaseSchemaGenerator
+
+            self._generator = BaseSchemaGenerator()
+        return self._generator
+
+    def endpoints(self) -> List["EndpointInfo"]:
         return self.generator.get_endpoints(self.app.routes)
 
+    def fingerprint(self) -> str:
+        """
+        Return a hash of everything documented from the application: routes, endpoints and exception handlers.
+
+        It does not require to parse docstrings and is the same across processes running the same code.
+        """
+        digest = hashlib.blake2b(digest_size=16)
+
+        def update(*values):
+            digest.update(repr(values).encode("utf-8"))
+
+        def update_function(func):
+            if func is not None:
+                name = getattr(func, "__qualname__", type(func).__qualname__)
+                update(getattr(func, "__module__", None), name, func.__doc__)
+
+        for _, route, prefix in _walk(self.app.routes, ""):
+            methods = sorted(getattr(route, "methods", None) or [])
+            update(
+                prefix,
+                getattr(route, "path", None),
+                methods,
+                getattr(route, "include_in_schema", None),
+            )
+            endpoint = getattr(route, "endpoint", None)
+            update_function(endpoint)
+            # Class based endpoints
+            for method in ["get", "post", "put", "patch", "delete", "options"]:
+                update_function(getattr(endpoint, method, None))
+
+        for status_code_or_exception, handler in self.app.exception_handlers.items():
+            # Either a status code or an exception class
+            update(
+                getattr(status_code_or_exception, "__module__", None),
+                getattr(
+                    status_code_or_exception, "__qualname__", status_code_or_exception
+                ),
+            )
+            update_function(handler)
+
+        return digest.hexdigest()
+
+    def new_endpoints(self) -> List["EndpointInfo"]:
+        """
+        Return endpoints that were added (or whose path was documented) since last call.
+        """
+        from starlette.schemas import EndpointInfo
+
+        start = time.perf_counter()
+        routes = list(_walk(self.app.routes, ""))
+        fingerprint = tuple(key for key, _, _ in routes)
+        if fingerprint == self._routes_fingerprint and not self._modified_paths:
+            if self.metrics:
+                self.metrics.observe(
+                    "discover_routes",
+                    time.perf_counter() - start,
+                    routes=len(routes),
+                    endpoints=0,
+                )
+            return []
+
+        new_endpoints = []
+        for key, route, prefix in routes:
+            if key in self._documented_routes:
+                continue
+            endpoints = [
+                EndpointInfo(f"{prefix}{path}", http_method, func)
+                for path, http_method, func in self.generator.get_endpoints([route])
+            ]
+            self._documented_routes[key] = route, endpoints
+            for endpoint in endpoints:
+                self._endpoint_routes[id(endpoint)] = route, prefix
+                self._documented_endpoints.setdefault(endpoint.path, []).append(
+                    endpoint
+                )
+            new_endpoints.extend(endpoints)
+
+        for path in self._modified_paths:
+            new_endpoints.extend(
+                endpoint
+                for endpoint in self._documented_endpoints.get(path, [])
+                if endpoint not in new_endpoints
+            )
+
+        self._routes_fingerprint = fingerprint
+        self._modified_paths = set()
+        if self.metrics:
+            self.metrics.observe(
+                "discover_routes",
+                time.perf_counter() - start,
+                routes=len(routes),
+                endpoints=len(new_endpoints),
+            )
+        return new_endpoints
+
     def path_helper(
         self,
         path=None,
         operations=None,
         parameters=None,
-        endpoint: EndpointInfo = None,
+        endpoint: "EndpointInfo" = None,
         **kwargs,
     ):
         # TODO Handle consumes and produces
         if endpoint is None:
             # Save operations to merge it when processing endpoints
             if operations and path:
+                self._modified_paths.add(path)
+                path_operations = self.operations.setdefault(path, {})
                 for method, operation in operations.items():
-                    previous_operation = self.operations.setdefault(
-                        path, {}
-                    ).setdefault(method, {})
-                    merge_dict(previous_operation, operation)
+                    path_operations[method] = self._merge(
+                        path_operations.get(method, {}), operation
+                    )
             return
 
         default_operation = {
             "operationId": f"{endpoint.http_method.lower()}_{endpoint.func.__name__}"
         }
 
-        summary = self._summary(endpoint.func)
+        summary, schema = self._parse(endpoint.func)
         if summary:
             default_operation["summary"] = summary
 
         # Allow to override auto generated documentation
-        default_operation.update(self.generator.parse_docstring(endpoint.func))
-        operations[endpoint.http_method] = default_operation
-        merge_dict(
+        default_operation.update(schema)
+        operation = operations[endpoint.http_method] = self._merge(
             default_operation,
             self.operations.get(path, {}).get(endpoint.http_method.lower(), {}),
         )
 
-    def _summary(self, func_or_method: Callable) -> Optional[str]:
+        route = self._endpoint_routes.get(id(endpoint))
+        if route is not None:
+            self._index_operation(*route, endpoint.http_method, operation)
+
+    def _index_operation(
+        self, route: BaseRoute, prefix: str, http_method: str, operation: dict
+    ):
+        if self._indexing is None:
+            self._indexing = dict(self._route_operations)
+        method = http_method.lower()
+        self._indexing[(id(route), method)] = operation
+        # An endpoint can be served by many routes
+        endpoint_key = (id(getattr(route, "endpoint", None)), method)
+        self._indexing[endpoint_key] = tuple(
+            entry
+            for entry in self._indexing.get(endpoint_key, ())
+            if entry[0] is not route
+        ) + (
+            (route, prefix, operation),
+        )
+        name = getattr(route, "name", None)
+        if name:
+            self._indexing[(name, method)] = operation
+
+    def publish_operations(self):
         """
-        Given a function, parse the docstring and return it as a string if this is not YAML.
+        Make operations documented since last call available to operation, all at once.
         """
-        docstring = func_or_method.__doc__
-        if not docstring:
-            return
+        if self._indexing is not None:
+            self._route_operations, self._indexing = self._indexing, None
 
-        # We support having regular docstrings before the schema
-        # definition. Here we return just the schema part from
-        # the docstring.
-        docstring = docstring.split("---")[0]
+    def operation(
+        self, route: Union[BaseRoute, Callable, str], http_method: str
+    ) -> Optional[dict]:
+        """
+        Return the documented operation (that should not be modified) or None if not documented.
 
-        parsed = yaml.safe_load(docstring)
+        Only routes documented by StarletteAPISpec are indexed (the definition must be built).
 
-        if isinstance(parsed, dict):
-            return
+        :param route: Starlette route, its endpoint (as in request.scope["endpoint"]) or its name.
+        An endpoint served by many routes is ambiguous (None is returned), provide the route instead.
+        :param http_method: HTTP method (case insensitive). HEAD falls back to GET.
+        """
+        if isinstance(route, (str, BaseRoute)):
+            return self._indexed(
+                route if isinstance(route, str) else id(route), http_method
+            )
+
+        entries = self._indexed(id(route), http_method)
+        return entries[0][2] if entries and len(entries) == 1 else None
+
+    def request_operation(self, scope: Mapping) -> Optional[dict]:
+        """
+        Return the documented operation (that should not be modified) of a routed request or None if not documented.
+
+        If the endpoint is served by many routes, the route matching the request is used (None if not found).
+
+        :param scope: ASGI scope (or Starlette request), once routed.
+        """
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return None
+        entries = self._indexed(id(endpoint), scope["method"])
+        if not entries:
+            return None
+        if len(entries) > 1:
+            entries = [
+                entry for entry in entries if _routed_through(scope, entry[0], entry[1])
+            ]
+        return entries[0][2] if len(entries) == 1 else None
+
+    def _indexed(self, key, http_method: str):
+        method = http_method.lower()
+        indexed = self._route_operations.get((key, method))
+        if indexed is None and method == "head":
+            indexed = self._route_operations.get((key, "get"))
+        return indexed
+
+
+@functools.lru_cache(maxsize=None)
+def _prefix_regex(prefix: str):
+    return compile_path(prefix)[0]
+
+
+def _routed_through(scope: Mapping, route: BaseRoute, prefix: str) -> bool:
+    """
+    Return True if the request was routed to this route (with the provided mount prefix).
+    """
+    root_path = scope.get("root_path", "")
+    # Mounts add the path they matched to root_path (app_root_path being the one before any mount)
+    mounted_path = root_path[len(scope.get("app_root_path", root_path)) :]
+    return bool(_prefix_regex(prefix).match(mounted_path)) and (
+        route.matches(scope)[0] == Match.FULL
+    )
+
+
+def _error_response(spec: APISpec, schema_name: str) -> dict:
+    if spec.openapi_version.major < 3:
+        return {"schema": {"$ref": f"#/definitions/{schema_name}"}}
+    return {
+        "content": {
+            "application/json": {
+                "schema": {"$ref": f"#/components/schemas/{schema_name}"}
+            }
+        }
+    }
 
-        return parsed
+
+def _walk(routes: Iterable[BaseRoute], prefix: str):
+    """
+    Yield every (non mount) route with its path prefix, identified by the route and endpoint identities.
+    """
+    for route in routes:
+        if isinstance(route, Mount):
+            yield from _walk(route.routes or [], f"{prefix}{route.path}")
+        else:
+            yield (
+                id(route),
+                id(getattr(route, "endpoint", None)),
+                prefix,
+            ), route, prefix
 
 
-def merge_dict(previous: dict, new: dict):
-    for previous_key, previous_value in previous.items():
-        if isinstance(previous_value, dict):
-            previous_value.update(new.pop(previous_key, {}))
-    previous.update(new)
+def merge_dict(previous: dict, new: dict) -> dict:
+    """
+    Return previous deeply merged with new (new values taking precedence), without modifying any of them.
+
+    Dictionaries are merged recursively, any other value (such as lists) is replaced.
+    Only dictionaries containing modified values are copied, unmodified branches are shared with previous and new.
+    """
+    merged = None
+    for key, new_value in new.items():
+        previous_value = previous.get(key)
+        if isinstance(previous_value, dict) and isinstance(new_value, dict):
+            value = merge_dict(previous_value, new_value)
+        else:
+            value = new_value
+        if value is not previous_value or key not in previous:
+            if merged is None:
+                merged = dict(previous)
+            merged[key] = value
+    return previous if merged is None else merged
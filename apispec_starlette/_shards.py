@@ -0,0 +1,230 @@
+import fnmatch
+import re
+from typing import Collection, Dict, Iterable, List, Optional
+
+from apispec_starlette._http import HTTP_METHODS
+
+# Name of the shard containing paths that are not part of any mount (or operations without tags)
+DEFAULT_SHARD = "default"
+
+# Name of the shards index, reserved so that a mount or tag with this name is served under another name
+INDEX = "index"
+
+# Sections of components that are restricted to the ones referred to by a shard
+_SWAGGER_SECTIONS = ("definitions", "responses", "parameters")
+_OPENAPI_3_SECTIONS = ("schemas", "responses", "parameters", "requestBodies", "headers")
+
+
+def _mount_name(mount_path: str) -> str:
+    return mount_path.strip("/").replace("/", "-") or DEFAULT_SHARD
+
+
+def shard_name(group: str) -> str:
+    """
+    Return the name a group of paths (mount or tag) is served as, "index" (and names derived from it) being suffixed.
+    """
+    return f"{group}_" if group.rstrip("_") == INDEX else group
+
+
+def group_name(shard: str) -> str:
+    """
+    Return the group of paths (mount or tag) of a shard (see shard_name).
+    """
+    return shard[:-1] if shard.rstrip("_") == INDEX and shard != INDEX else shard
+
+
+def group_by_mount(paths: dict, mount_paths: Iterable[str]) -> Dict[str, List[str]]:
+    """
+    Return paths per shard, a shard being a mount of the application (named after its path).
+    """
+    # Longest mount paths first so that the most specific mount is used
+    mount_paths = sorted(mount_paths, key=len, reverse=True)
+    shards = {}
+    for path in paths:
+        shard = DEFAULT_SHARD
+        for mount_path in mount_paths:
+            if path.startswith(f"{mount_path.rstrip('/')}/"):
+                shard = _mount_name(mount_path)
+                break
+        shards.setdefault(shard, []).append(path)
+    return shards
+
+
+def group_by_tag(paths: dict) -> Dict[str, List[str]]:
+    """
+    Return paths per shard, a shard being an operation tag. A path can belong to many shards.
+    """
+    shards = {}
+    for path, path_item in paths.items():
+        for method, operation in path_item.items():
+            if method not in HTTP_METHODS or not isinstance(operation, dict):
+                continue
+            for tag in operation.get("tags") or [DEFAULT_SHARD]:
+                shard_paths = shards.setdefault(tag, [])
+                if not shard_paths or shard_paths[-1] != path:
+                    shard_paths.append(path)
+    return shards
+
+
+def shard_document(document: dict, paths: List[str], tag: str = None) -> dict:
+    """
+    Return the definition restricted to the provided paths (and to operations with this tag if provided).
+
+    Only components referred to (directly or not) by those paths are kept.
+    """
+    operations = {}
+    for path in paths:
+        if tag is None:
+            operations[path] = None
+        else:
+            operations[path] = [
+                method
+                for method, operation in document["paths"][path].items()
+                if method in HTTP_METHODS
+                and tag in (operation.get("tags") or [DEFAULT_SHARD])
+            ]
+    return partial_document(document, operations)
+
+
+def partial_document(
+    document: dict, operations: Dict[str, Optional[Collection[str]]]
+) -> dict:
+    """
+    Return the definition restricted to the provided operations (methods per path, None for every method).
+
+    Only components referred to (directly or not) by those operations are kept.
+    """
+    partial_paths = {}
+    for path, methods in operations.items():
+        path_item = document["paths"][path]
+        if methods is not None:
+            path_item = {
+                key: value
+                for key, value in path_item.items()
+                if key not in HTTP_METHODS or key in methods
+            }
+        partial_paths[path] = path_item
+
+    partial = {key: value for key, value in document.items() if key != "paths"}
+    partial["paths"] = partial_paths
+    _keep_referenced_components(partial)
+    return partial
+
+
+def _keep_referenced_components(shard: dict):
+    referenced = set()
+    pending = list(_references(shard["paths"]))
+    while pending:
+        reference = pending.pop()
+        if reference not in referenced:
+            referenced.add(reference)
+            pending.extend(_references(_component(shard, reference)))
+
+    for section in _SWAGGER_SECTIONS:
+        if isinstance(shard.get(section), dict):
+            shard[section] = _referenced(shard[section], f"#/{section}/", referenced)
+
+    components = shard.get("components")
+    if isinstance(components, dict):
+        shard["components"] = {
+            section: (
+                _referenced(section_components, f"#/components/{section}/", referenced)
+                if section in _OPENAPI_3_SECTIONS
+                else section_components
+            )
+            for section, section_components in components.items()
+        }
+
+
+def _referenced(components: dict, prefix: str, referenced: set) -> dict:
+    return {
+        name: component
+        for name, component in components.items()
+        if f"{prefix}{name}" in referenced
+    }
+
+
+def _component(document: dict, reference: str):
+    """
+    Return the component referred to by a local reference (such as #/definitions/Name), or None.
+    """
+    if not reference.startswith("#/"):
+        return None
+    component = document
+    for key in reference[2:].split("/"):
+        if not isinstance(component, dict):
+            return None
+        component = component.get(key)
+    return component
+
+
+def _references(value):
+    if isinstance(value, dict):
+        reference = value.get("$ref")
+        if isinstance(reference, str):
+            yield reference
+        for item in value.values():
+            yield from _references(item)
+    elif isinstance(value, list):
+        for item in value:
+            yield from _references(item)
+
+
+class OperationIndex:
+    """
+    Operations of a definition per path, tag and method, to select operations without going through the definition.
+    """
+
+    def __init__(self, paths: dict):
+        # Tags per method, per path
+        self.operations: Dict[str, Dict[str, frozenset]] = {}
+        # Paths per tag
+        self.tags: Dict[str, List[str]] = {}
+        self.positions = {path: position for position, path in enumerate(paths)}
+        for path, path_item in paths.items():
+            methods = self.operations[path] = {}
+            for method, operation in path_item.items():
+                if method not in HTTP_METHODS or not isinstance(operation, dict):
+                    continue
+                tags = methods[method] = frozenset(operation.get("tags") or [])
+                for tag in tags:
+                    tag_paths = self.tags.setdefault(tag, [])
+                    if not tag_paths or tag_paths[-1] != path:
+                        tag_paths.append(path)
+
+    def select(
+        self,
+        paths: Collection[str] = (),
+        tags: Collection[str] = (),
+        methods: Collection[str] = (),
+    ) -> Dict[str, List[str]]:
+        """
+        Return methods per path of operations matching every provided filter.
+
+        :param paths: Path patterns (shell-style wildcards), matching any of them.
+        :param tags: Tags, matching operations having any of them.
+        :param methods: HTTP methods (lower case), matching any of them.
+        """
+        if tags:
+            # Keep paths in definition order
+            candidates = sorted(
+                {path for tag in tags for path in self.tags.get(tag, [])},
+                key=self.positions.__getitem__,
+            )
+        else:
+            candidates = self.operations
+        if paths:
+            pattern = re.compile("|".join(fnmatch.translate(path) for path in paths))
+            candidates = [path for path in candidates if pattern.match(path)]
+
+        selected = {}
+        for path in candidates:
+            path_methods = [
+                method
+                for method, method_tags in self.operations[path].items()
+                if (not methods or method in methods)
+                and (not tags or not method_tags.isdisjoint(tags))
+            ]
+            if path_methods:
+                selected[path] = path_methods
+        return selected
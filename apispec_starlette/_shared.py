@@ -0,0 +1,136 @@
+import mmap
+import os
+import tempfile
+import time
+from typing import Callable, Optional, Union
+
+
+class FileSpecCache:
+    """
+    Share JSON encoded OpenAPI definitions between processes (workers) through files in a local directory.
+
+    Definitions are identified by a fingerprint of the application (see StarletteAPISpec.fingerprint).
+    The first process to need a definition builds and publishes it, other processes wait for it and memory map it.
+    Only the most recently published definitions are kept.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        *,
+        timeout: float = 30.0,
+        poll_interval: float = 0.05,
+        max_definitions: int = 8,
+    ):
+        """
+        :param directory: Directory where definitions are stored. Created if it does not exist.
+        :param timeout: Maximum number of seconds to wait for another process to publish a definition.
+        The definition is built by the waiting process afterwards. Default to 30 seconds.
+        :param poll_interval: Number of seconds between two checks while waiting. Default to 50 milliseconds.
+        :param max_definitions: Maximum number of definitions to keep in the directory, older ones are removed when
+        publishing. Default to 8.
+        """
+        self.directory = directory
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self.max_definitions = max_definitions
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, fingerprint: str) -> str:
+        return os.path.join(self.directory, f"{fingerprint}.json")
+
+    def get(self, fingerprint: str) -> Optional[memoryview]:
+        """
+        Return the memory mapped definition or None if not published yet.
+        """
+        try:
+            with open(self._path(fingerprint), "rb") as file:
+                return memoryview(mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ))
+        except (FileNotFoundError, ValueError):  # ValueError is raised for empty files
+            return None
+
+    def publish(self, fingerprint: str, content: bytes):
+        """
+        Store the definition. Readers will either see the previous file or the new one, never a partial one.
+        """
+        file_descriptor, temporary_path = tempfile.mkstemp(
+            dir=self.directory, suffix=".tmp"
+        )
+        try:
+            with os.fdopen(file_descriptor, "wb") as file:
+                file.write(content)
+            os.replace(temporary_path, self._path(fingerprint))
+        except BaseException:
+            os.remove(temporary_path)
+            raise
+        self._prune(f"{fingerprint}.json")
+
+    def _prune(self, published: str):
+        """
+        Remove definitions that are not amongst the max_definitions most recently published.
+
+        :param published: File name of the definition that was just published (always kept).
+        """
+        definitions = []
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith(".json") or entry.name == published:
+                continue
+            try:
+                definitions.append((entry.stat().st_mtime_ns, entry.path))
+            except FileNotFoundError:  # pragma: no cover
+                # Removed by another process meanwhile
+                pass
+
+        definitions.sort(reverse=True)
+        for _, path in definitions[max(self.max_definitions - 1, 0) :]:
+            try:
+                os.remove(path)
+            except OSError:  # pragma: no cover
+                # Removed by another process meanwhile or still mapped (Windows)
+                pass
+
+    def get_or_build(
+        self, fingerprint: str, build: Callable[[], bytes]
+    ) -> Union[bytes, memoryview]:
+        """
+        Return the published definition. Build and publish it if no other process is already building it.
+        """
+        content = self.get(fingerprint)
+        if content is not None:
+            return content
+
+        lock_path = f"{self._path(fingerprint)}.lock"
+        try:
+            os.close(os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        except FileExistsError:
+            content = self._wait_for(fingerprint, lock_path)
+            if content is not None:
+                return content
+            # Previous builder is either too slow or dead
+            content = build()
+            self.publish(fingerprint, content)
+            return content
+
+        try:
+            content = build()
+            self.publish(fingerprint, content)
+        finally:
+            os.remove(lock_path)
+        return content
+
+    def _wait_for(self, fingerprint: str, lock_path: str) -> Optional[memoryview]:
+        deadline = time.monotonic() + self.timeout
+        while time.monotonic() < deadline:
+            time.sleep(self.poll_interval)
+            content = self.get(fingerprint)
+            if content is not None:
+                return content
+            if not os.path.exists(lock_path):
+                # Builder failed
+                return None
+
+        # Consider the lock as stale so that it does not slow down other processes
+        try:
+            os.remove(lock_path)
+        except FileNotFoundError:  # pragma: no cover
+            pass
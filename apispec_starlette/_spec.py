@@ -0,0 +1,870 @@
+import asyncio
+import functools
+import gzip
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Executor, Future
+from typing import (
+    Optional,
+    Callable,
+    Any,
+    Union,
+    Iterator,
+    Mapping,
+    Dict,
+    List,
+    Collection,
+)
+
+from apispec import APISpec
+from starlette.applications import Starlette
+from starlette.routing import Mount
+
+from apispec_starlette._deduplicate import deduplicate as _deduplicate
+from apispec_starlette._docstring_cache import DocstringFileCache
+from apispec_starlette._json import json_encoder as _json_encoder
+from apispec_starlette._metrics import SpecMetrics
+from apispec_starlette._openapi3 import to_openapi3
+from apispec_starlette._plugin import StarlettePlugin
+from apispec_starlette._shards import (
+    group_by_mount,
+    group_by_tag,
+    group_name,
+    shard_document,
+    shard_name,
+    partial_document,
+    OperationIndex,
+)
+from apispec_starlette._shared import FileSpecCache
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover (depends on brotli being installed)
+    brotli = None
+
+# Supported content encodings, by order of preference
+# Levels are moderate as maximum ones take seconds on large definitions for a few percent less bytes
+_compressors = {"gzip": functools.partial(gzip.compress, compresslevel=6)}
+if brotli:  # pragma: no cover (depends on brotli being installed)
+    _compressors = {"br": functools.partial(brotli.compress, quality=5), **_compressors}
+
+
+def _member(dumps: Callable, key, value) -> bytes:
+    """
+    Encode a single key/value pair of a JSON object (without the surrounding braces).
+    """
+    return dumps({key: value})[1:-1]
+
+
+# Sections of the definition where each component is encoded (and cached) on its own
+_COMPONENT_SECTIONS = ("definitions", "responses", "parameters")
+
+
+def _detached(document: dict) -> dict:
+    """
+    Return a copy of the definition that is not affected by documenting afterwards.
+
+    Documented values are replaced (never modified in place), so only the containers they are stored in are copied.
+    """
+    detached = {}
+    for key, value in document.items():
+        if key == "paths":
+            value = {path: dict(path_item) for path, path_item in value.items()}
+        elif key == "components":
+            value = {
+                section: (
+                    dict(components) if isinstance(components, dict) else components
+                )
+                for section, components in value.items()
+            }
+        elif isinstance(value, (dict, list)):
+            value = value.copy()
+        detached[key] = value
+    return detached
+
+
+def _lru_get(cache: OrderedDict, key):
+    value = cache.get(key)
+    if value is not None:
+        try:
+            cache.move_to_end(key)
+        except KeyError:  # pragma: no cover (evicted by another thread meanwhile)
+            pass
+    return value
+
+
+def _lru_set(cache: OrderedDict, key, value, max_size: int):
+    cache[key] = value
+    while len(cache) > max_size:
+        try:
+            cache.popitem(last=False)
+        except KeyError:  # pragma: no cover (evicted by another thread meanwhile)
+            break
+
+
+def _filters_key(
+    paths: Collection[str],
+    tags: Collection[str],
+    methods: Collection[str],
+    base_path: Optional[str],
+) -> tuple:
+    return (
+        tuple(sorted(set(paths))),
+        tuple(sorted(set(tags))),
+        tuple(sorted({method.lower() for method in methods})),
+        base_path,
+    )
+
+
+class JSONDocument:
+    """
+    JSON encoded OpenAPI definition alongside HTTP related information, computed once.
+
+    Compressed content is computed on first use, per content encoding.
+    """
+
+    def __init__(self, content: bytes, encodings: tuple = ()):
+        self.content = content
+        self.etag = f'"{hashlib.blake2b(content, digest_size=16).hexdigest()}"'
+        # Content encodings that can be sent
+        self.encodings = encodings
+        # Compressed content per content encoding
+        self.encoded = {}
+        # Most recently requested documents derived from this one with another base path
+        self.variants = OrderedDict()
+
+    def encoded_etag(self, encoding: str) -> str:
+        return f'{self.etag[:-1]}-{encoding}"'
+
+    def compressed(self, encoding: str) -> bytes:
+        """
+        Return the content compressed using this content encoding, compressing it if not already done.
+        """
+        encoded = self.encoded.get(encoding)
+        if encoded is None:
+            encoded = self.encoded[encoding] = _compressors[encoding](self.content)
+        return encoded
+
+
+class _Snapshot:
+    """
+    OpenAPI definition as built at some point, alongside what is derived from it (computed on first access).
+
+    Once published, the definition is never modified, derived values are only added.
+    """
+
+    def __init__(self, document: Optional[dict] = None):
+        self.document = document
+        self.serialized: Optional[JSONDocument] = None
+        # OpenAPI 3 rendering of the definition
+        self.openapi3_document: Optional[dict] = None
+        self.openapi3_serialized: Optional[JSONDocument] = None
+        # Paths per shard name, per kind of shard
+        self.shard_groups = {}
+        # JSON encoded shards (and shards index) per kind of shard and name
+        self.shards = {}
+        self.operation_index: Optional[OperationIndex] = None
+        # Most recently requested filtered definitions, per filters and base path
+        self.filtered = OrderedDict()
+        # Fingerprint of what the definition is built from (only computed when refreshed)
+        self.fingerprint: Optional[str] = None
+
+
+class StarletteAPISpec(APISpec):
+    """
+    APISpec documenting every endpoint of a Starlette application.
+
+    The OpenAPI definition is built on first access and kept in memory (as a dictionary and as JSON bytes).
+    Documenting a path (using spec.path or document_* functions) invalidates it.
+    Call invalidate if routes are added to the application once the definition was built.
+
+    The definition can be requested for a specific base path (usually provided by a reverse proxy).
+    The most recently requested base paths are kept in memory (up to max_base_path_variants).
+
+    Each path (and each component) is kept JSON encoded, only paths documented since last build are encoded again.
+    Components are encoded again if they were registered again (modifying a registered component is not detected).
+
+    JSON is encoded using orjson if installed (unless another json_encoder is provided).
+
+    If a shared_cache is provided, the JSON encoded definition is built by a single process and shared with others.
+
+    If compress is set, compressed versions of the definition (gzip and brotli if installed) are also kept in memory.
+
+    If metrics are provided, every build phase is measured and reported to it (see SpecMetrics).
+
+    The definition can be restricted to some operations (see filtered), the most recently requested ones are kept in
+    memory (up to max_filtered_definitions).
+
+    The definition can be split into shards (per mount or per tag), each shard is encoded on first access.
+
+    The definition can also be rendered as OpenAPI 3 (see openapi3), it is converted from the same build.
+
+    If deduplicate is set, inline responses and schemas repeated at least that many times are moved to components
+    (named after a hash of their content) and referenced instead, if it makes the definition shorter.
+
+    Each build publishes a new snapshot of the definition at once, reading it never waits for a lock and never sees
+    a partially built definition. Building and documenting (spec.path, document_* functions, invalidate) hold spec.lock,
+    so that they happen one at a time. Hold it as well to document using other APISpec methods while serving requests.
+    """
+
+    def __init__(
+        self,
+        app: Starlette,
+        *,
+        title: str,
+        version: str,
+        openapi_version: str = "2.0",
+        plugins: list = None,
+        max_base_path_variants: int = 16,
+        compress: bool = False,
+        json_encoder: Union[str, Callable[[Any], bytes]] = None,
+        shared_cache: FileSpecCache = None,
+        docstring_cache: DocstringFileCache = None,
+        metrics: SpecMetrics = None,
+        deduplicate: int = None,
+        max_filtered_definitions: int = 32,
+        **options,
+    ):
+        self.starlette_plugin = StarlettePlugin(app, docstring_cache, metrics)
+        self.metrics = metrics
+        self.deduplicate = deduplicate
+        # References introduced by last deduplication
+        self._references = set()
+        self.max_base_path_variants = max_base_path_variants
+        self.max_filtered_definitions = max_filtered_definitions
+        self.encodings = tuple(_compressors) if compress else ()
+        self.json_encoder = _json_encoder(json_encoder)
+        self.shared_cache = shared_cache
+        # Held while building or documenting
+        self.lock = threading.RLock()
+        # Last published definition
+        self._snapshot = _Snapshot()
+        # In-flight builds, per kind of build
+        self._builds = {}
+        # JSON encoded path items, per path
+        self._path_fragments = {}
+        # Paths that were documented since they were last encoded
+        self._modified_paths = set()
+        # Component and its JSON encoding, per section and name
+        self._component_fragments = {}
+        # Number of fragments reused by last encoding
+        self._cached_fragments = 0
+        super().__init__(
+            title=title,
+            version=version,
+            openapi_version=openapi_version,
+            plugins=(plugins or []) + [self.starlette_plugin],
+            **options,
+        )
+
+    def path(self, path=None, **kwargs):
+        with self.lock:
+            self._document_path(path, **kwargs)
+            self.invalidate()
+        return self
+
+    def _document_path(self, path, **kwargs):
+        super().path(path, **kwargs)
+        self._modified_paths.add(path)
+
+    def invalidate(self):
+        """
+        Discard the OpenAPI definition so that it will be built again on next access.
+        """
+        with self.lock:
+            self._snapshot = _Snapshot()
+            self._builds = {}
+
+    def refresh(self):
+        """
+        Discard the OpenAPI definition if anything was documented since it was built (see fingerprint), so that it
+        will be built again on next access. Otherwise, what was derived from it (encoded, filtered, shards) is kept.
+
+        If a shared_cache is provided, a definition already published by another process is used instead of building.
+        """
+        with self.lock:
+            fingerprint = self.fingerprint()
+            if self._snapshot.fingerprint != fingerprint:
+                snapshot = _Snapshot()
+                snapshot.fingerprint = fingerprint
+                if self.shared_cache:
+                    content = self.shared_cache.get(fingerprint)
+                    if content is not None:
+                        snapshot.serialized = JSONDocument(content, self.encodings)
+                # Not using invalidate as in-flight builds (including the calling one) are still valid
+                self._snapshot = snapshot
+
+    def document(self) -> dict:
+        """
+        Return the OpenAPI definition, documenting every application endpoint if not already built.
+
+        Only endpoints that were not yet documented (or whose path was documented since) are processed.
+        The definition should not be modified.
+        """
+        return self._built().document
+
+    def _built(self) -> _Snapshot:
+        """
+        Return the last published snapshot, building and publishing a new one if the definition was invalidated.
+        """
+        snapshot = self._snapshot
+        if snapshot.document is None:
+            with self.lock:
+                # Another thread might have built it meanwhile
+                snapshot = self._snapshot
+                if snapshot.document is None:
+                    built = _Snapshot(self._build())
+                    # Might have been retrieved from the shared cache without building
+                    built.serialized = snapshot.serialized
+                    built.fingerprint = snapshot.fingerprint
+                    self._snapshot = snapshot = built
+        return snapshot
+
+    def _build(self) -> dict:
+        for endpoint in self.starlette_plugin.new_endpoints():
+            self._document_path(endpoint.path, endpoint=endpoint)
+        self.starlette_plugin.report_metrics()
+        start = time.perf_counter()
+        document = _detached(self.to_dict())
+        if self.metrics:
+            self.metrics.observe(
+                "to_dict",
+                time.perf_counter() - start,
+                paths=len(document.get("paths", {})),
+            )
+        if self.deduplicate:
+            document = self._deduplicated(document)
+        self.starlette_plugin.publish_operations()
+        return document
+
+    def _deduplicated(self, document: dict) -> dict:
+        start = time.perf_counter()
+        document, references = _deduplicate(document, self.deduplicate)
+        if references != self._references:
+            # Paths that were not documented again might refer to other components now
+            self._path_fragments.clear()
+            self._references = references
+        if self.metrics:
+            self.metrics.observe(
+                "deduplicate", time.perf_counter() - start, references=len(references)
+            )
+        return document
+
+    def request_operation(self, scope: Mapping) -> Optional[dict]:
+        """
+        Return the documented operation (that should not be modified) of a request.
+
+        The operation is retrieved from the last published build (the definition is never built by this method), so it
+        is None until the definition is built for the first time. Documenting afterwards is only reflected once the
+        definition is built again.
+
+        The operation is retrieved from the endpoint matched by routing, so it is only available once routed
+        (within an endpoint, or after call_next within a middleware). If the endpoint is served by many routes, the
+        route matching the request is used.
+
+        :param scope: ASGI scope (or Starlette request).
+        """
+        return self.starlette_plugin.request_operation(scope)
+
+    def content(self, base_path: str = None) -> bytes:
+        """
+        Return the OpenAPI definition as JSON encoded bytes, building it if not already built.
+
+        :param base_path: basePath to document if not already provided as an option.
+        """
+        return self.serialized(base_path).content
+
+    def serialized(self, base_path: str = None) -> JSONDocument:
+        """
+        Return the JSON encoded OpenAPI definition, building it if not already built.
+
+        :param base_path: basePath to document if not already provided as an option.
+        """
+        serialized = self._snapshot.serialized
+        if serialized is None:
+            # Encoded fragments are shared between builds
+            with self.lock:
+                serialized = self._snapshot.serialized
+                if serialized is None:
+                    if self.shared_cache:
+                        content = self.shared_cache.get_or_build(
+                            self.fingerprint(),
+                            lambda: self._measured_encode(self.document()),
+                        )
+                    else:
+                        content = self._measured_encode(self.document())
+                    serialized = JSONDocument(content, self.encodings)
+                    # Building the definition publishes a new snapshot
+                    self._snapshot.serialized = serialized
+        return self._with_base_path(serialized, base_path)
+
+    def _measured_encode(self, document: dict) -> bytes:
+        if not self.metrics:
+            return self._encode(document)
+
+        start = time.perf_counter()
+        content = self._encode(document)
+        self.metrics.observe(
+            "serialize",
+            time.perf_counter() - start,
+            bytes=len(content),
+            cached_fragments=self._cached_fragments,
+        )
+        return content
+
+    def fingerprint(self) -> str:
+        """
+        Return a hash of everything documented: application routes and exception handlers, documented operations,
+        options and deduplicate setting. It is the same across processes running the same code.
+        """
+        digest = hashlib.blake2b(digest_size=16)
+        with self.lock:
+            digest.update(self.starlette_plugin.fingerprint().encode("utf-8"))
+            # Paths are the result of the build (operations documented outside of endpoints are handled below)
+            documented = {
+                key: value for key, value in self.to_dict().items() if key != "paths"
+            }
+            documented["operations"] = self.starlette_plugin.operations
+            # Settings changing the encoded definition
+            documented["deduplicate"] = self.deduplicate
+            digest.update(json.dumps(documented, default=str).encode("utf-8"))
+        return digest.hexdigest()
+
+    def _encode(self, document: dict) -> bytes:
+        """
+        Encode the definition as JSON, reusing already encoded paths and components.
+        """
+        self._cached_fragments = 0
+        members = []
+        for key, value in document.items():
+            if key == "paths":
+                encoded = self._encode_paths(value)
+            elif key in _COMPONENT_SECTIONS:
+                encoded = self._encode_components(key, value)
+            else:
+                encoded = self.json_encoder(value)
+            members.append(b"".join((self.json_encoder(key), b":", encoded)))
+        return b"".join((b"{", b",".join(members), b"}"))
+
+    def _encode_paths(self, paths: dict) -> bytes:
+        fragments = self._path_fragments
+        modified_paths, self._modified_paths = self._modified_paths, set()
+        encoded = []
+        for path, path_item in paths.items():
+            fragment = None if path in modified_paths else fragments.get(path)
+            if fragment is None:
+                fragment = fragments[path] = _member(self.json_encoder, path, path_item)
+            else:
+                self._cached_fragments += 1
+            encoded.append(fragment)
+        return b"".join((b"{", b",".join(encoded), b"}"))
+
+    def _encode_components(self, section: str, components: dict) -> bytes:
+        fragments = self._component_fragments
+        encoded = []
+        for name, component in components.items():
+            cached = fragments.get((section, name))
+            if cached is None or cached[0] is not component:
+                cached = fragments[(section, name)] = (
+                    component,
+                    _member(self.json_encoder, name, component),
+                )
+            else:
+                self._cached_fragments += 1
+            encoded.append(cached[1])
+        return b"".join((b"{", b",".join(encoded), b"}"))
+
+    def _base_path_member(
+        self, base_path: Optional[str], openapi3: bool
+    ) -> Optional[tuple]:
+        """
+        Return the key and value documenting base_path, or None if there is nothing to document.
+        """
+        if base_path is None:
+            return None
+        if openapi3:
+            # Servers are documented if provided as an option (or converted from host and basePath)
+            if any(key in self.options for key in ("servers", "host", "basePath")):
+                return None
+            return b"servers", [{"url": base_path}]
+        if "basePath" in self.options:
+            return None
+        return b"basePath", base_path
+
+    async def _with_base_path_async(
+        self,
+        executor: Executor,
+        serialized: JSONDocument,
+        base_path: Optional[str],
+        openapi3: bool = False,
+    ) -> JSONDocument:
+        if self._base_path_member(base_path, openapi3) is None:
+            return serialized
+        variant = _lru_get(serialized.variants, base_path)
+        if variant is None:
+            variant = await asyncio.wrap_future(
+                executor.submit(self._with_base_path, serialized, base_path, openapi3)
+            )
+        return variant
+
+    def _with_base_path(
+        self, serialized: JSONDocument, base_path: Optional[str], openapi3: bool = False
+    ) -> JSONDocument:
+        member = self._base_path_member(base_path, openapi3)
+        if member is None:
+            return serialized
+        key, value = member
+
+        variant = _lru_get(serialized.variants, base_path)
+        if variant is None:
+            # Key is not part of the definition, so it can be appended as the last key
+            variant = JSONDocument(
+                b"".join(
+                    (
+                        serialized.content[:-1],
+                        b',"',
+                        key,
+                        b'":',
+                        self.json_encoder(value),
+                        b"}",
+                    )
+                ),
+                self.encodings,
+            )
+            _lru_set(
+                serialized.variants, base_path, variant, self.max_base_path_variants
+            )
+        return variant
+
+    def openapi3(self) -> dict:
+        """
+        Return the OpenAPI 3 definition, building the definition if not already built.
+
+        It is converted from the Swagger 2.0 definition (routes and docstrings are only processed once for both).
+        """
+        return self._openapi3(self._built())
+
+    @staticmethod
+    def _openapi3(snapshot: _Snapshot) -> dict:
+        document = snapshot.openapi3_document
+        if document is None:
+            document = snapshot.openapi3_document = to_openapi3(snapshot.document)
+        return document
+
+    def openapi3_serialized(self, base_path: str = None) -> JSONDocument:
+        """
+        Return the JSON encoded OpenAPI 3 definition, building the definition if not already built.
+
+        :param base_path: URL of the server to document if host and basePath options are not provided.
+        """
+        snapshot = self._built()
+        serialized = snapshot.openapi3_serialized
+        if serialized is None:
+            serialized = snapshot.openapi3_serialized = JSONDocument(
+                self.json_encoder(self._openapi3(snapshot)), self.encodings
+            )
+        return self._with_base_path(serialized, base_path, openapi3=True)
+
+    async def openapi3_serialized_async(
+        self, executor: Executor, refresh: bool = False, base_path: str = None
+    ) -> JSONDocument:
+        """
+        Return the JSON encoded OpenAPI 3 definition without blocking the event loop (see serialized_async).
+
+        :param executor: Executor used to build the definition.
+        :param refresh: Build the definition again if anything was documented since (see refresh), unless a build
+        is already in progress.
+        :param base_path: URL of the server to document if host and basePath options are not provided.
+        """
+        serialized = await self._build_async(
+            executor,
+            refresh,
+            "openapi3_serialized",
+            lambda: self._snapshot.openapi3_serialized,
+            self.openapi3_serialized,
+        )
+        return await self._with_base_path_async(
+            executor, serialized, base_path, openapi3=True
+        )
+
+    def shards(self, by: str) -> Dict[str, List[str]]:
+        """
+        Return the paths of each shard, building the definition if not already built.
+
+        A mount or tag named index is served as the index_ shard (as index is the name of the shards index).
+
+        :param by: "mount" to have a shard per mount of the application (paths outside of mounts are in the default
+        shard), "tag" to have a shard per operation tag (operations without tags are in the default shard).
+        """
+        return self._shard_groups(self._built(), by)
+
+    def _shard_groups(self, snapshot: _Snapshot, by: str) -> Dict[str, List[str]]:
+        groups = snapshot.shard_groups.get(by)
+        if groups is None:
+            paths = snapshot.document.get("paths", {})
+            if by == "mount":
+                groups = group_by_mount(
+                    paths,
+                    [
+                        route.path
+                        for route in self.starlette_plugin.app.routes
+                        if isinstance(route, Mount)
+                    ],
+                )
+            elif by == "tag":
+                groups = group_by_tag(paths)
+            else:
+                raise ValueError(
+                    f"{by} is not a valid kind of shard. Valid values are mount and tag."
+                )
+            groups = {shard_name(group): paths for group, paths in groups.items()}
+            snapshot.shard_groups[by] = groups
+        return groups
+
+    def shard(self, name: str, by: str) -> Optional[JSONDocument]:
+        """
+        Return the JSON encoded definition restricted to a shard (see shards) or None if there is no such shard.
+
+        Only components referred to by the shard paths are part of it.
+        """
+        snapshot = self._built()
+        serialized = snapshot.shards.get((by, name))
+        if serialized is None:
+            paths = self._shard_groups(snapshot, by).get(name)
+            if paths is None:
+                return None
+            document = shard_document(
+                snapshot.document, paths, tag=group_name(name) if by == "tag" else None
+            )
+            serialized = snapshot.shards[(by, name)] = JSONDocument(
+                self.json_encoder(document), self.encodings
+            )
+        return serialized
+
+    def shards_index(self, by: str) -> JSONDocument:
+        """
+        Return the JSON encoded list of shards (see shards), with their URL relative to the index.
+        """
+        snapshot = self._built()
+        serialized = snapshot.shards.get((by, None))
+        if serialized is None:
+            index = {
+                "shards": [
+                    {"name": name, "url": f"{name}.json", "paths": len(paths)}
+                    for name, paths in self._shard_groups(snapshot, by).items()
+                ]
+            }
+            serialized = snapshot.shards[(by, None)] = JSONDocument(
+                self.json_encoder(index), self.encodings
+            )
+        return serialized
+
+    def operation_index(self) -> OperationIndex:
+        """
+        Return operations per path, tag and method, building the definition if not already built.
+        """
+        return self._operation_index(self._built())
+
+    @staticmethod
+    def _operation_index(snapshot: _Snapshot) -> OperationIndex:
+        index = snapshot.operation_index
+        if index is None:
+            index = snapshot.operation_index = OperationIndex(
+                snapshot.document.get("paths", {})
+            )
+        return index
+
+    def filtered(
+        self,
+        *,
+        paths: Collection[str] = (),
+        tags: Collection[str] = (),
+        methods: Collection[str] = (),
+        base_path: str = None,
+    ) -> JSONDocument:
+        """
+        Return the JSON encoded definition restricted to operations matching every provided filter.
+
+        Only components referred to by those operations are part of it.
+
+        :param paths: Path patterns (shell-style wildcards such as /users*), matching any of them.
+        :param tags: Tags, matching operations having any of them.
+        :param methods: HTTP methods (case insensitive), matching any of them.
+        :param base_path: basePath to document if not already provided as an option.
+        """
+        key = _filters_key(paths, tags, methods, base_path)
+        snapshot = self._built()
+        filtered = _lru_get(snapshot.filtered, key)
+        if filtered is None:
+            operations = self._operation_index(snapshot).select(*key[:3])
+            document = partial_document(snapshot.document, operations)
+            if base_path is not None and "basePath" not in self.options:
+                document["basePath"] = base_path
+            filtered = JSONDocument(self.json_encoder(document), self.encodings)
+            _lru_set(snapshot.filtered, key, filtered, self.max_filtered_definitions)
+        return filtered
+
+    async def filtered_async(
+        self,
+        executor: Executor,
+        refresh: bool = False,
+        *,
+        paths: Collection[str] = (),
+        tags: Collection[str] = (),
+        methods: Collection[str] = (),
+        base_path: str = None,
+    ) -> JSONDocument:
+        """
+        Return the JSON encoded filtered definition (see filtered) without blocking the event loop.
+
+        :param executor: Executor used to build the definition.
+        :param refresh: Build the definition again if anything was documented since (see refresh), unless a build
+        is already in progress.
+        """
+        key = _filters_key(paths, tags, methods, base_path)
+        return await self._build_async(
+            executor,
+            refresh,
+            f"filtered:{key}",
+            lambda: _lru_get(self._snapshot.filtered, key),
+            lambda: self.filtered(
+                paths=paths, tags=tags, methods=methods, base_path=base_path
+            ),
+        )
+
+    async def shard_async(
+        self, executor: Executor, name: Optional[str], by: str, refresh: bool = False
+    ) -> Optional[JSONDocument]:
+        """
+        Return the JSON encoded shard (or shards index if name is None) without blocking the event loop.
+
+        :param executor: Executor used to build the definition.
+        :param name: Name of the shard, None for the shards index.
+        :param by: mount or tag (see shards).
+        :param refresh: Build the definition again if anything was documented since (see refresh), unless a build
+        is already in progress.
+        """
+        return await self._build_async(
+            executor,
+            refresh,
+            f"shard:{by}:{name}",
+            lambda: self._snapshot.shards.get((by, name)),
+            (
+                (lambda: self.shards_index(by))
+                if name is None
+                else (lambda: self.shard(name, by))
+            ),
+        )
+
+    async def serialized_async(
+        self, executor: Executor, refresh: bool = False, base_path: str = None
+    ) -> JSONDocument:
+        """
+        Return the JSON encoded OpenAPI definition without blocking the event loop.
+
+        Cached definition is returned directly. Otherwise the definition is built within the provided executor.
+        Concurrent calls share the same in-flight build.
+
+        :param executor: Executor used to build the definition.
+        :param refresh: Build the definition again if anything was documented since (see refresh), unless a build
+        is already in progress.
+        :param base_path: basePath to document if not already provided as an option.
+        """
+        serialized = await self._build_async(
+            executor,
+            refresh,
+            "serialized",
+            lambda: self._snapshot.serialized,
+            self.serialized,
+        )
+        return await self._with_base_path_async(executor, serialized, base_path)
+
+    async def document_async(self, executor: Executor, refresh: bool = False) -> dict:
+        """
+        Return the OpenAPI definition without blocking the event loop.
+
+        Cached definition is returned directly. Otherwise the definition is built within the provided executor.
+        Concurrent calls share the same in-flight build.
+
+        :param executor: Executor used to build the definition.
+        :param refresh: Build the definition again if anything was documented since (see refresh), unless a build
+        is already in progress.
+        """
+        return await self._build_async(
+            executor,
+            refresh,
+            "document",
+            lambda: self._snapshot.document,
+            self.document,
+        )
+
+    async def _build_async(
+        self,
+        executor: Executor,
+        refresh: bool,
+        kind: str,
+        cached: Callable[[], Any],
+        build: Callable[[], Any],
+    ):
+        future = self._builds.get(kind)
+        if future is None:
+            if refresh:
+                # Detecting what was documented must not block the event loop either
+                future = executor.submit(self._refreshed, build)
+            else:
+                result = cached()
+                if result is not None:
+                    return result
+                future = executor.submit(build)
+            self._builds[kind] = future
+            future.add_done_callback(functools.partial(self._build_done, kind))
+        return await asyncio.wrap_future(future)
+
+    def _refreshed(self, build: Callable[[], Any]):
+        self.refresh()
+        return build()
+
+    def _build_done(self, kind: str, future: Future):
+        if self._builds.get(kind) is future:
+            del self._builds[kind]
+
+    def iter_content(
+        self, base_path: str = None, document: dict = None, chunk_size: int = 65536
+    ) -> Iterator[bytes]:
+        """
+        Yield the OpenAPI definition as JSON encoded chunks, building it if not already built.
+
+        The encoded definition is not kept in memory, only chunk_size bytes (plus a path or component) at most.
+
+        :param base_path: basePath to document if not already provided as an option.
+        :param document: Already built definition. Default to the current definition.
+        :param chunk_size: Minimum number of bytes per chunk (except for the last one). Default to 64 KiB.
+        """
+        dumps = self.json_encoder
+        members = list((document or self.document()).items())
+        if base_path is not None and "basePath" not in self.options:
+            members.append(("basePath", base_path))
+
+        chunk = bytearray(b"{")
+        for index, (key, value) in enumerate(members):
+            if index:
+                chunk += b","
+            chunk += dumps(key) + b":"
+            if key != "paths" and key not in _COMPONENT_SECTIONS:
+                chunk += dumps(value)
+                continue
+
+            chunk += b"{"
+            for item_index, (name, item) in enumerate(value.items()):
+                if item_index:
+                    chunk += b","
+                chunk += _member(dumps, name, item)
+                if len(chunk) >= chunk_size:
+                    yield bytes(chunk)
+                    chunk.clear()
+            chunk += b"}"
+        chunk += b"}"
+        yield bytes(chunk)
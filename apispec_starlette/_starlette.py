@@ -1,9 +1,127 @@
-from apispec import APISpec
+import asyncio
+import mmap
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Optional, Union, Callable, Any, Iterator
+
 from starlette.applications import Starlette
 from starlette.requests import Request
-from starlette.responses import JSONResponse, Response
+from starlette.responses import Response
+from starlette.types import Scope, Receive, Send
+
+from apispec_starlette._docstring_cache import DocstringFileCache
+from apispec_starlette._metrics import SpecMetrics
+from apispec_starlette._shared import FileSpecCache
+from apispec_starlette._spec import StarletteAPISpec, JSONDocument, _compressors
+
+# Building the definition is CPU bound, there is no need to use more than one thread
+_build_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="swagger_json")
+
+
+class _DocumentResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        # Content is already encoded (bytes or memory mapped file)
+        return content
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison is used for If-None-Match
+    return any(
+        candidate.strip().replace("W/", "", 1) == etag
+        for candidate in if_none_match.split(",")
+    )
+
+
+def _preferred_encoding(accept_encoding: str, encodings) -> Optional[str]:
+    qualities = {}
+    for accepted in accept_encoding.split(","):
+        coding, _, parameters = accepted.partition(";")
+        quality = 1.0
+        parameters = parameters.strip()
+        if parameters.startswith("q="):
+            try:
+                quality = float(parameters[2:])
+            except ValueError:
+                quality = 0.0
+        qualities[coding.strip().lower()] = quality
+
+    preferred, preferred_quality = None, 0.0
+    for encoding in encodings:
+        quality = qualities.get(encoding, qualities.get("*", 0.0))
+        if quality > preferred_quality:
+            preferred, preferred_quality = encoding, quality
+    return preferred
+
+
+async def _document_response(
+    request: Request,
+    serialized: JSONDocument,
+    cache_control: str,
+    executor: Executor,
+) -> Response:
+    content, etag, headers, encoding = serialized.content, serialized.etag, {}, None
+    if serialized.encodings:
+        headers["Vary"] = "Accept-Encoding"
+        encoding = _preferred_encoding(
+            request.headers.get("Accept-Encoding", ""), serialized.encodings
+        )
+        if encoding:
+            etag = serialized.encoded_etag(encoding)
+            headers["Content-Encoding"] = encoding
 
-from apispec_starlette._plugin import StarlettePlugin
+    headers["ETag"] = etag
+    if cache_control:
+        headers["Cache-Control"] = cache_control
+
+    if_none_match = request.headers.get("If-None-Match")
+    if if_none_match and _etag_matches(if_none_match, etag):
+        headers.pop("Content-Encoding", None)
+        return Response(status_code=304, headers=headers)
+
+    if encoding:
+        content = serialized.encoded.get(encoding)
+        if content is None:
+            # Compressed on first request accepting this encoding
+            content = await asyncio.wrap_future(
+                executor.submit(serialized.compressed, encoding)
+            )
+    return _DocumentResponse(content, headers=headers)
+
+
+class _StreamedDocumentResponse(Response):
+    media_type = "application/json"
+
+    def __init__(
+        self, chunks: Iterator[bytes], executor: Executor, headers: dict = None
+    ):
+        self.chunks = chunks
+        self.executor = executor
+        super().__init__(headers=headers)
+
+    def render(self, content) -> None:
+        # Content length is unknown
+        return None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send(
+            {
+                "type": "http.response.start",
+                "status": self.status_code,
+                "headers": self.raw_headers,
+            }
+        )
+        while True:
+            # Each chunk is encoded within the executor so that other requests are handled meanwhile
+            chunk = await asyncio.wrap_future(
+                self.executor.submit(next, self.chunks, None)
+            )
+            if chunk is None:
+                break
+            await send({"type": "http.response.body", "body": chunk, "more_body": True})
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
 
 
 def add_swagger_json_endpoint(
@@ -12,8 +130,23 @@ def add_swagger_json_endpoint(
     title: str = "My API",
     version: str = "0.0.1",
     plugins: list = None,
-    **options
-) -> APISpec:
+    cache: bool = False,
+    executor: Executor = None,
+    max_base_path_variants: int = 16,
+    cache_control: str = None,
+    compress: bool = False,
+    json_encoder: Union[str, Callable[[Any], bytes]] = None,
+    stream: bool = False,
+    shared_cache: FileSpecCache = None,
+    docstring_cache: DocstringFileCache = None,
+    metrics: SpecMetrics = None,
+    prewarm: str = None,
+    deduplicate: int = None,
+    openapi_json: bool = False,
+    shards: str = None,
+    max_filtered_definitions: int = 32,
+    **options,
+) -> StarletteAPISpec:
     """
     Create an APISpec instance and add a /swagger.json endpoint to return the OpenAPI definition 2.0 (Swagger).
 
@@ -23,26 +156,219 @@ def add_swagger_json_endpoint(
     :param title: OpenAPI definition title. Default to "My API".
     :param version: OpenAPI definition version. Default to "0.0.1".
     :param plugins: APISpec plugins to use in addition to the StarlettePlugin.
+    :param cache: Build the OpenAPI definition once (on first request) and serve it from memory afterwards.
+    Call spec.invalidate() if routes are added to the application afterwards. Default to False (checked for changes, and built again if needed, on every request).
+    :param executor: Executor used to build the OpenAPI definition outside of the event loop.
+    Default to a dedicated single thread executor.
+    :param max_base_path_variants: Maximum number of definitions to keep in memory for distinct X-Forwarded-Prefix
+    header values. Default to 16.
+    :param cache_control: Value of the Cache-Control header sent with the definition. Default to no header.
+    An ETag header is always sent and conditional requests (If-None-Match) are answered by 304 Not Modified.
+    :param compress: Keep gzip (and brotli if installed) compressed definitions in memory and send them according to
+    the Accept-Encoding request header. Each encoding is compressed (within the executor) on first request accepting
+    it. Default to False. The endpoint should not be compressed by GZipMiddleware then.
+    :param json_encoder: "orjson", "json" (standard library) or a function returning JSON encoded bytes.
+    Default to orjson if installed, standard library otherwise.
+    :param stream: Send the definition by chunks, encoded (within the executor) while sending, so that it is never fully
+    encoded in memory.
+    Default to False. ETag and compression are not handled when streaming.
+    :param shared_cache: Cache used to share the definition between processes (such as FileSpecCache).
+    The definition will then only be built by one worker. Default to no sharing.
+    :param docstring_cache: Cache used to store parsed docstrings on disk (such as DocstringFileCache).
+    Default to parsing docstrings in every process.
+    :param metrics: Receiver of build phases measures (such as PrometheusMetrics). Default to no measure.
+    :param prewarm: Build the definition (within the executor) on application startup so that the first request does
+    not pay for it. "blocking" to delay startup until the definition is built, "background" to build it while the
+    application is already serving requests. Requires cache to be set. Default to building it on first request.
+    Startup event handlers are not called if the application was created with a lifespan.
+    :param deduplicate: Move inline responses and schemas repeated at least this number of times to definitions and
+    responses, and refer to them instead (only when it makes the definition shorter). Default to keeping them inline.
+    :param openapi_json: Also add a /openapi.json endpoint to return the OpenAPI definition 3, converted from the
+    same build. Default to False. stream parameter only applies to /swagger.json.
+    :param shards: Also add /swagger/{shard}.json endpoints to return a part of the definition, and a
+    /swagger/index.json endpoint listing them. "mount" for a shard per application mount, "tag" for a shard per
+    operation tag. Each shard is encoded on first request. Default to no shards.
+    :param max_filtered_definitions: Maximum number of filtered definitions to keep in memory. Default to 32.
+    /swagger.json can be filtered using paths (shell-style wildcards), tags and methods query parameters
+    (comma separated or repeated), such as /swagger.json?paths=/users*&methods=get.
     :param options: APISpec additional options.
     :return: APISpec instance.
     """
-    plugin = StarlettePlugin(app)
-    spec = APISpec(
+    # Validated before modifying the application
+    if shards not in (None, "mount", "tag"):
+        raise ValueError(
+            f"{shards} is not a valid kind of shard. Valid values are mount and tag."
+        )
+
+    spec = StarletteAPISpec(
+        app,
         title=title,
         version=version,
         openapi_version="2.0",
-        plugins=(plugins or []) + [plugin],
-        **options
+        plugins=plugins,
+        max_base_path_variants=max_base_path_variants,
+        compress=compress,
+        json_encoder=json_encoder,
+        shared_cache=shared_cache,
+        docstring_cache=docstring_cache,
+        metrics=metrics,
+        deduplicate=deduplicate,
+        max_filtered_definitions=max_filtered_definitions,
+        **options,
     )
 
+    executor = executor or _build_executor
+
+    if prewarm is not None:
+        _add_prewarm_handler(app, spec, executor, prewarm, cache, stream)
+
     @app.route("/swagger.json", include_in_schema=False)
-    def schema(request: Request) -> Response:
-        for endpoint in plugin.endpoints():
-            spec.path(path=endpoint.path, endpoint=endpoint)
+    async def schema(request: Request) -> Response:
+        base_path = request.headers.get("X-Forwarded-Prefix")
+        filters = _filters(request)
+        if filters:
+            serialized = await spec.filtered_async(
+                executor, refresh=not cache, base_path=base_path, **filters
+            )
+            return await _document_response(
+                request, serialized, cache_control, executor
+            )
+
+        if stream:
+            document = await spec.document_async(executor, refresh=not cache)
+            return _StreamedDocumentResponse(
+                spec.iter_content(base_path, document),
+                executor,
+                headers={"Cache-Control": cache_control} if cache_control else None,
+            )
+
+        serialized = await spec.serialized_async(
+            executor, refresh=not cache, base_path=base_path
+        )
+        return await _document_response(request, serialized, cache_control, executor)
+
+    if shards is not None:
+        _add_shard_endpoints(app, spec, executor, shards, cache, cache_control)
 
-        if "X-Forwarded-Prefix" in request.headers:
-            spec.options.setdefault("basePath", request.headers["X-Forwarded-Prefix"])
+    if openapi_json:
 
-        return JSONResponse(spec.to_dict())
+        @app.route("/openapi.json", include_in_schema=False)
+        async def openapi3_schema(request: Request) -> Response:
+            serialized = await spec.openapi3_serialized_async(
+                executor,
+                refresh=not cache,
+                base_path=request.headers.get("X-Forwarded-Prefix"),
+            )
+            return await _document_response(
+                request, serialized, cache_control, executor
+            )
 
     return spec
+
+
+def _filters(request: Request) -> dict:
+    filters = {}
+    for name in ("paths", "tags", "methods"):
+        values = [
+            value
+            for parameter in request.query_params.getlist(name)
+            for value in parameter.split(",")
+            if value
+        ]
+        if values:
+            filters[name] = values
+    return filters
+
+
+def _add_shard_endpoints(
+    app: Starlette,
+    spec: StarletteAPISpec,
+    executor: Executor,
+    by: str,
+    cache: bool,
+    cache_control: str,
+):
+    @app.route("/swagger/index.json", include_in_schema=False)
+    async def shards_index(request: Request) -> Response:
+        serialized = await spec.shard_async(executor, None, by, refresh=not cache)
+        return await _document_response(request, serialized, cache_control, executor)
+
+    @app.route("/swagger/{shard}.json", include_in_schema=False)
+    async def shard(request: Request) -> Response:
+        serialized = await spec.shard_async(
+            executor, request.path_params["shard"], by, refresh=not cache
+        )
+        if serialized is None:
+            return Response(status_code=404)
+        return await _document_response(request, serialized, cache_control, executor)
+
+
+def _add_prewarm_handler(
+    app: Starlette,
+    spec: StarletteAPISpec,
+    executor: Executor,
+    prewarm: str,
+    cache: bool,
+    stream: bool,
+):
+    if prewarm not in ("blocking", "background"):
+        raise ValueError(
+            f"{prewarm} is not a valid prewarm value. Valid values are blocking and background."
+        )
+    if not cache:
+        # Every request would build the definition again
+        raise ValueError("prewarm can only be used with cache.")
+
+    def build():
+        # The JSON encoded definition is not used when streaming
+        if stream:
+            return spec.document_async(executor)
+        return spec.serialized_async(executor)
+
+    # Keep a reference to the background task so that it is not garbage collected
+    tasks = []
+
+    async def build_definition():
+        if prewarm == "blocking":
+            await build()
+            return
+
+        task = asyncio.ensure_future(build())
+        # Failure will be raised again by the first request (that will build the definition again)
+        task.add_done_callback(lambda done: done.cancelled() or done.exception())
+        tasks.append(task)
+
+    app.add_event_handler("startup", build_definition)
+
+
+def add_swagger_json_file_endpoint(
+    app: Starlette,
+    file_path: str,
+    *,
+    cache_control: str = None,
+    compress: bool = False,
+):
+    """
+    Add a /swagger.json endpoint to return a prebuilt OpenAPI definition (see python -m apispec_starlette).
+
+    The file is memory mapped and served as is (X-Forwarded-Prefix header is not handled).
+
+    :param app: Starlette application.
+    :param file_path: Path to the JSON encoded OpenAPI definition.
+    :param cache_control: Value of the Cache-Control header sent with the definition. Default to no header.
+    An ETag header is always sent and conditional requests (If-None-Match) are answered by 304 Not Modified.
+    :param compress: Keep gzip (and brotli if installed) compressed definitions in memory and send them according to
+    the Accept-Encoding request header. Each encoding is compressed (within a dedicated thread) on first request
+    accepting it. Default to False.
+    """
+    with open(file_path, "rb") as file:
+        mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    serialized = JSONDocument(
+        memoryview(mapped), tuple(_compressors) if compress else ()
+    )
+
+    @app.route("/swagger.json", include_in_schema=False)
+    async def schema(request: Request) -> Response:
+        return await _document_response(
+            request, serialized, cache_control, _build_executor
+        )
@@ -0,0 +1,290 @@
+"""
+Measure how OpenAPI definition generation scales with the size of a Starlette application.
+
+    python -m benchmarks.spec_generation
+    python -m benchmarks.spec_generation --routes 10 1000 10000 --repeat 5
+
+For every scenario, the following is reported:
+    * build: Time to document every endpoint (route discovery, docstring parsing, merging, to_dict).
+    * init_spec: Time to create the APISpec (exception handlers documentation).
+    * serialize: Time to encode the definition as JSON.
+    * rebuild: Time to build the definition again once nothing changed.
+    * peak: Peak memory allocated during a cold build and serialization.
+    * req/s: Requests per second served by the /swagger.json endpoint (cached definition).
+    * merge: Time to merge operations (merge_dict).
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+import tracemalloc
+from typing import Callable, List
+
+from starlette.applications import Starlette
+from starlette.routing import Mount, Route, Router
+
+from apispec_starlette import add_swagger_json_endpoint, StarletteAPISpec
+from apispec_starlette._plugin import _parse_docstring, merge_dict
+
+LARGE_DOCSTRING = """
+Endpoint {index} summary
+---
+parameters:
+{parameters}
+responses:
+    200:
+        description: "Operation {index} succeeded"
+        schema:
+            type: object
+            properties:
+{properties}
+    404:
+        description: "Resource {index} not found"
+"""
+
+
+def _docstring(index: int, size: int) -> str:
+    parameters = "".join(
+        f"""
+    - name: parameter{parameter}
+      in: query
+      type: string
+      description: Parameter {parameter} of endpoint {index}"""
+        for parameter in range(size)
+    )
+    properties = "".join(
+        f"""
+                field{field}:
+                    type: string
+                    description: Field {field} of endpoint {index}"""
+        for field in range(size)
+    )
+    return LARGE_DOCSTRING.format(
+        index=index, parameters=parameters, properties=properties
+    )
+
+
+def _endpoint(index: int, docstring_size: int) -> Callable:
+    def endpoint(request):
+        pass  # pragma: no cover
+
+    endpoint.__name__ = f"endpoint_{index}"
+    endpoint.__doc__ = _docstring(index, docstring_size)
+    return endpoint
+
+
+def _exception_handler(status_code: int) -> Callable:
+    def handler(request, exc):
+        pass  # pragma: no cover
+
+    handler.__doc__ = f"""
+    properties:
+        message:
+            type: string
+            description: Error {status_code}
+    type: object
+    """
+    return handler
+
+
+def synthetic_application(
+    routes: int,
+    *,
+    mounts: int = 0,
+    docstring_size: int = 2,
+    exception_handlers: int = 0,
+) -> Starlette:
+    """
+    Create a Starlette application with the requested number of routes.
+
+    :param routes: Total number of routes.
+    :param mounts: Number of nested mount levels routes are spread into (0 to have only root routes).
+    :param docstring_size: Number of parameters and response fields documented by each endpoint.
+    :param exception_handlers: Number of documented exception handlers.
+    """
+    app = Starlette(
+        exception_handlers={
+            400 + status_code: _exception_handler(400 + status_code)
+            for status_code in range(exception_handlers)
+        }
+    )
+
+    levels = [app.router]
+    for level in range(mounts):
+        sub_router = Router()
+        levels[-1].routes.append(Mount(f"/level{level}", app=sub_router))
+        levels.append(sub_router)
+
+    for index in range(routes):
+        router = levels[index % len(levels)]
+        router.routes.append(
+            Route(
+                f"/resource{index}/{{identifier}}",
+                _endpoint(index, docstring_size),
+                methods=["GET", "POST"],
+            )
+        )
+    return app
+
+
+def _timed(function: Callable, repeat: int, setup: Callable = lambda: None) -> float:
+    """
+    Return the median duration (in seconds) of function, called with the result of setup.
+    """
+    durations = []
+    for _ in range(repeat):
+        argument = setup()
+        start = time.perf_counter()
+        function(argument)
+        durations.append(time.perf_counter() - start)
+    return statistics.median(durations)
+
+
+async def _requests_per_second(app: Starlette, duration: float) -> float:
+    scope = {
+        "type": "http",
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": "/swagger.json",
+        "root_path": "",
+        "query_string": b"",
+        "headers": [],
+        "server": ("testserver", 80),
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    requests = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < duration:
+        await app(dict(scope), receive, send)
+        requests += 1
+    return requests / (time.perf_counter() - start)
+
+
+def run_scenario(
+    name: str, repeat: int, duration: float, **application_parameters
+) -> dict:
+    app = synthetic_application(**application_parameters)
+
+    def new_spec(_=None) -> StarletteAPISpec:
+        _parse_docstring.cache_clear()
+        return StarletteAPISpec(app, title="Benchmark", version="1.0.0")
+
+    def built_spec() -> StarletteAPISpec:
+        spec = new_spec()
+        spec.document()
+        return spec
+
+    def invalidated_spec() -> StarletteAPISpec:
+        spec = built_spec()
+        spec.invalidate()
+        return spec
+
+    init_spec = _timed(new_spec, repeat)
+    build = _timed(lambda spec: spec.document(), repeat, setup=new_spec)
+    serialize = _timed(lambda spec: spec.content(), repeat, setup=built_spec)
+    rebuild = _timed(lambda spec: spec.document(), repeat, setup=invalidated_spec)
+
+    tracemalloc.start()
+    new_spec().content()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    # Add /swagger.json first so that routing is not part of the measure
+    add_swagger_json_endpoint(app, cache=True).content()
+    app.router.routes.insert(0, app.router.routes.pop())
+    requests_per_second = asyncio.get_event_loop().run_until_complete(
+        _requests_per_second(app, duration)
+    )
+
+    return {
+        "scenario": name,
+        "init_spec": init_spec,
+        "build": build,
+        "serialize": serialize,
+        "rebuild": rebuild,
+        "peak": peak,
+        "req/s": requests_per_second,
+    }
+
+
+def merge_benchmark(repeat: int, operations: int) -> float:
+    def merge(_):
+        for index in range(operations):
+            merge_dict(
+                {"operationId": f"get_{index}", "responses": {"200": {}}},
+                {"responses": {"401": {}, "403": {}}, "security": [{"oauth2": []}]},
+            )
+
+    return _timed(merge, repeat)
+
+
+def scenarios(routes: List[int]) -> List[dict]:
+    result = []
+    for route_count in routes:
+        result.append(dict(name=f"{route_count} routes", routes=route_count))
+    largest = max(routes)
+    result.append(dict(name=f"{largest} routes in 5 mounts", routes=largest, mounts=5))
+    result.append(
+        dict(
+            name=f"{min(largest, 1000)} routes with large docstrings",
+            routes=min(largest, 1000),
+            docstring_size=50,
+        )
+    )
+    result.append(
+        dict(name="100 exception handlers", routes=10, exception_handlers=100)
+    )
+    return result
+
+
+def _format(result: dict) -> str:
+    return (
+        f"{result['scenario']:<40}"
+        f"{result['init_spec'] * 1000:>14.2f}"
+        f"{result['build'] * 1000:>14.2f}"
+        f"{result['serialize'] * 1000:>14.2f}"
+        f"{result['rebuild'] * 1000:>14.2f}"
+        f"{result['peak'] / 1024 / 1024:>12.2f}"
+        f"{result['req/s']:>12.0f}"
+    )
+
+
+def main(args: List[str] = None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--routes", type=int, nargs="+", default=[10, 1000, 10000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--duration",
+        type=float,
+        default=1.0,
+        help="Seconds spent requesting /swagger.json per scenario.",
+    )
+    arguments = parser.parse_args(args)
+
+    print(
+        f"{'scenario':<40}{'init_spec ms':>14}{'build ms':>14}{'serialize ms':>14}"
+        f"{'rebuild ms':>14}{'peak MiB':>12}{'req/s':>12}"
+    )
+    for scenario in scenarios(arguments.routes):
+        name = scenario.pop("name")
+        print(
+            _format(
+                run_scenario(name, arguments.repeat, arguments.duration, **scenario)
+            ),
+            flush=True,
+        )
+
+    merge = merge_benchmark(arguments.repeat, operations=10000)
+    print(f"merge_dict of 10000 operations: {merge * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
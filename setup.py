@@ -46,12 +46,18 @@ setup(
         "pyyaml==5.*",
     ],
     extras_require={
+        # Used to send brotli compressed definition
+        "brotli": ["brotli==1.*"],
+        # Used to encode definition faster
+        "orjson": ["orjson==3.*"],
         "testing": [
             # Used to manage testing of a Starlette application
             "requests==2.*",
             # Used to check coverage
             "pytest-cov==2.*",
-        ]
+            # Used to check orjson encoding
+            "orjson==3.*",
+        ],
     },
     python_requires=">=3.6",
     project_urls={
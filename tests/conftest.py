@@ -0,0 +1,38 @@
+import pytest
+from starlette.applications import Starlette
+
+
+@pytest.fixture
+def application() -> Starlette:
+    """
+    Application with a documented error response, a documented endpoint and an undocumented one.
+    """
+
+    async def handle_exception(request, exc):
+        """
+        properties:
+            message:
+                type: string
+                description: "Unicode description: é ✓"
+        type: object
+        """
+        pass  # pragma: no cover
+
+    app = Starlette(exception_handlers={400: handle_exception})
+
+    @app.route("/test")
+    def test_endpoint(request):
+        """
+        Test summary
+        ---
+        responses:
+            200:
+                description: "ok"
+        """
+        pass  # pragma: no cover
+
+    @app.route("/other")
+    def other_endpoint(request):
+        pass  # pragma: no cover
+
+    return app
@@ -0,0 +1,40 @@
+from benchmarks.spec_generation import main, synthetic_application
+from apispec_starlette import StarletteAPISpec
+
+
+def test_synthetic_application():
+    app = synthetic_application(6, mounts=2, exception_handlers=2)
+    spec = StarletteAPISpec(app, title="Benchmark", version="1.0.0")
+
+    paths = spec.document()["paths"]
+    assert sorted(paths) == [
+        "/level0/level1/resource2/{identifier}",
+        "/level0/level1/resource5/{identifier}",
+        "/level0/resource1/{identifier}",
+        "/level0/resource4/{identifier}",
+        "/resource0/{identifier}",
+        "/resource3/{identifier}",
+    ]
+    assert paths["/resource0/{identifier}"]["get"]["summary"] == "Endpoint 0 summary"
+    assert sorted(spec.document()["responses"]) == [400, 401]
+
+
+def test_benchmarks_can_run(capsys):
+    main(["--routes", "2", "--repeat", "1", "--duration", "0.01"])
+
+    output = capsys.readouterr().out.splitlines()
+    assert output[0].split() == [
+        "scenario",
+        "init_spec",
+        "ms",
+        "build",
+        "ms",
+        "serialize",
+        "ms",
+        "rebuild",
+        "ms",
+        "peak",
+        "MiB",
+        "req/s",
+    ]
+    assert len(output) == 6
@@ -0,0 +1,261 @@
+import json
+
+from starlette.applications import Starlette
+
+from apispec_starlette import (
+    StarletteAPISpec,
+    document_endpoint_oauth2_authentication,
+)
+from apispec_starlette._deduplicate import deduplicate
+
+USER_SCHEMA = {
+    "type": "object",
+    "required": ["name", "email"],
+    "properties": {
+        "name": {"type": "string", "description": "Full name"},
+        "email": {"type": "string", "format": "email"},
+        "age": {"type": "integer", "minimum": 0},
+    },
+}
+
+
+def _secured_application(endpoints: int) -> Starlette:
+    app = Starlette()
+    for index in range(endpoints):
+
+        def endpoint(request):
+            """
+            responses:
+                200:
+                    description: "ok"
+                    schema:
+                        type: object
+                        required:
+                            - name
+                            - email
+                        properties:
+                            name:
+                                type: string
+                                description: "Full name"
+                            email:
+                                type: string
+                                format: email
+                            age:
+                                type: integer
+                                minimum: 0
+            """
+            pass  # pragma: no cover
+
+        endpoint.__name__ = f"endpoint{index}"
+        app.add_route(f"/test{index}", endpoint)
+    return app
+
+
+def _secure(spec: StarletteAPISpec, endpoints: range):
+    for index in endpoints:
+        document_endpoint_oauth2_authentication(
+            spec, endpoint=f"/test{index}", method="get", required_scopes=["scope"]
+        )
+
+
+def test_repeated_responses_and_schemas_are_deduplicated():
+    spec = StarletteAPISpec(
+        _secured_application(4), title="Test API", version="1.0.0", deduplicate=2
+    )
+    _secure(spec, range(4))
+    document = spec.document()
+
+    assert sorted(document["definitions"]) == ["Schemab712a49ec71854db"]
+    assert document["definitions"]["Schemab712a49ec71854db"] == USER_SCHEMA
+    assert sorted(document["responses"]) == [
+        "Response51ef15fb3302761d",
+        "Responseac9d61b0924220af",
+        "Responseface025efc991560",
+    ]
+    assert document["responses"]["Response51ef15fb3302761d"] == {
+        "description": "ok",
+        "schema": {"$ref": "#/definitions/Schemab712a49ec71854db"},
+    }
+    for index in range(4):
+        assert document["paths"][f"/test{index}"]["get"] == {
+            "operationId": f"get_endpoint{index}",
+            "responses": {
+                "200": {"$ref": "#/responses/Response51ef15fb3302761d"},
+                "401": {"$ref": "#/responses/Responseac9d61b0924220af"},
+                "403": {"$ref": "#/responses/Responseface025efc991560"},
+            },
+            "security": [{"oauth2": ["scope"]}],
+        }
+    assert json.loads(spec.content()) == document
+
+
+def test_documented_definition_is_not_modified():
+    spec = StarletteAPISpec(
+        _secured_application(2), title="Test API", version="1.0.0", deduplicate=2
+    )
+    spec.document()
+    assert "definitions" not in spec.to_dict()
+    assert spec.to_dict()["paths"]["/test0"]["get"]["responses"]["200"] == {
+        "description": "ok",
+        "schema": USER_SCHEMA,
+    }
+
+
+def test_responses_not_repeated_enough_to_save_bytes_are_kept_inline():
+    spec = StarletteAPISpec(
+        _secured_application(3), title="Test API", version="1.0.0", deduplicate=2
+    )
+    _secure(spec, range(3))
+    document = spec.document()
+
+    assert sorted(document["definitions"]) == ["Schemab712a49ec71854db"]
+    # Shared schema makes the response too short to be worth sharing 3 times
+    assert sorted(document["responses"]) == [
+        "Responseac9d61b0924220af",
+        "Responseface025efc991560",
+    ]
+    assert document["paths"]["/test0"]["get"]["responses"]["200"] == {
+        "description": "ok",
+        "schema": {"$ref": "#/definitions/Schemab712a49ec71854db"},
+    }
+
+
+def test_responses_below_threshold_are_kept_inline():
+    spec = StarletteAPISpec(
+        _secured_application(3), title="Test API", version="1.0.0", deduplicate=4
+    )
+    _secure(spec, range(3))
+    document = spec.document()
+    assert document == spec.to_dict()
+    assert "responses" not in document
+
+
+def test_references_are_encoded_once_threshold_is_reached():
+    spec = StarletteAPISpec(
+        _secured_application(2), title="Test API", version="1.0.0", deduplicate=3
+    )
+    _secure(spec, range(2))
+    first = json.loads(spec.content())
+    assert first["paths"]["/test0"]["get"]["responses"]["401"] == {
+        "description": "No permission -- see authorization schemes",
+        "schema": {"type": "string"},
+    }
+
+    spec.starlette_plugin.app.add_route("/test2", lambda request: None)
+    _secure(spec, range(2, 3))
+    content = json.loads(spec.content())
+    # /test0 was not documented again but is now referring to the shared response
+    assert content["paths"]["/test0"]["get"]["responses"]["401"] == {
+        "$ref": "#/responses/Responseac9d61b0924220af"
+    }
+    assert content == spec.document()
+
+
+def test_openapi_3_definition():
+    response = {
+        "description": "ok",
+        "content": {"application/json": {"schema": USER_SCHEMA}},
+    }
+    document = {
+        "openapi": "3.0.2",
+        "paths": {
+            "/first": {"get": {"responses": {"200": response}}},
+            "/second": {
+                "post": {
+                    "requestBody": {
+                        "content": {"application/json": {"schema": USER_SCHEMA}}
+                    },
+                    "responses": {"200": response},
+                },
+                "parameters": [],
+            },
+        },
+    }
+
+    deduplicated, references = deduplicate(document, 2)
+
+    # Responses are not repeated enough to be worth sharing
+    assert references == {"#/components/schemas/Schemab712a49ec71854db"}
+    assert deduplicated["components"] == {
+        "schemas": {"Schemab712a49ec71854db": USER_SCHEMA}
+    }
+    assert deduplicated["paths"]["/first"]["get"]["responses"]["200"] == {
+        "description": "ok",
+        "content": {
+            "application/json": {
+                "schema": {"$ref": "#/components/schemas/Schemab712a49ec71854db"}
+            }
+        },
+    }
+    assert deduplicated["paths"]["/second"]["post"]["requestBody"] == {
+        "content": {
+            "application/json": {
+                "schema": {"$ref": "#/components/schemas/Schemab712a49ec71854db"}
+            }
+        }
+    }
+    # Provided definition is not modified
+    assert document["paths"]["/first"]["get"]["responses"]["200"] is response
+    assert "components" not in document
+
+
+def test_objects_shorter_than_references_are_kept_inline():
+    not_found = {
+        "description": "Resource not found, check the identifier provided in path",
+        "schema": {"type": "string"},
+    }
+    document = {
+        "swagger": "2.0",
+        "paths": {
+            f"/test{index}": {
+                "get": {"responses": {"200": {"description": "ok"}, "404": not_found}}
+            }
+            for index in range(3)
+        },
+    }
+
+    deduplicated, references = deduplicate(document, 2)
+
+    # {"description": "ok"} is shorter than a reference to it
+    assert references == {"#/responses/Response2d5d38a99f7f1491"}
+    assert deduplicated["responses"] == {"Response2d5d38a99f7f1491": not_found}
+    for index in range(3):
+        assert deduplicated["paths"][f"/test{index}"]["get"]["responses"] == {
+            "200": {"description": "ok"},
+            "404": {"$ref": "#/responses/Response2d5d38a99f7f1491"},
+        }
+    assert len(json.dumps(deduplicated)) < len(json.dumps(document))
+
+
+def test_parameter_schemas_are_deduplicated():
+    body = {"name": "body", "in": "body", "schema": USER_SCHEMA}
+    document = {
+        "swagger": "2.0",
+        "paths": {
+            "/first": {"post": {"parameters": [body]}},
+            "/second": {
+                "put": {"parameters": [{"name": "id", "in": "query"}, body]},
+                # Unexpected values are kept as is
+                "patch": {"parameters": ["invalid"], "responses": None},
+            },
+        },
+    }
+
+    deduplicated, references = deduplicate(document, 2)
+
+    assert references == {"#/definitions/Schemab712a49ec71854db"}
+    assert deduplicated["definitions"] == {"Schemab712a49ec71854db": USER_SCHEMA}
+    shared_body = {
+        "name": "body",
+        "in": "body",
+        "schema": {"$ref": "#/definitions/Schemab712a49ec71854db"},
+    }
+    assert deduplicated["paths"]["/first"]["post"] == {"parameters": [shared_body]}
+    assert deduplicated["paths"]["/second"]["put"] == {
+        "parameters": [{"name": "id", "in": "query"}, shared_body]
+    }
+    assert (
+        deduplicated["paths"]["/second"]["patch"]
+        is document["paths"]["/second"]["patch"]
+    )
+    assert document["paths"]["/first"]["post"]["parameters"] == [body]
@@ -0,0 +1,108 @@
+import os
+import tempfile
+
+from apispec_starlette import DocstringFileCache, StarletteAPISpec
+from apispec_starlette import _plugin
+
+
+def _marshal_files(directory) -> list:
+    return [name for name in os.listdir(directory) if name.endswith(".marshal")]
+
+
+def test_parsed_docstrings_are_reused_by_new_processes(
+    tmp_path, monkeypatch, application
+):
+    app = application
+    expected = StarletteAPISpec(
+        app,
+        title="Test API",
+        version="1.0.0",
+        docstring_cache=DocstringFileCache(tmp_path),
+    ).content()
+    assert len(_marshal_files(tmp_path)) == 2
+
+    # Simulate a new process
+    _plugin._parse_docstring.cache_clear()
+
+    def parse_yaml(docstring):
+        raise Exception("Docstring should not be parsed")
+
+    monkeypatch.setattr(_plugin, "_parse_yaml_docstring", parse_yaml)
+    spec = StarletteAPISpec(
+        app,
+        title="Test API",
+        version="1.0.0",
+        docstring_cache=DocstringFileCache(tmp_path),
+    )
+    assert spec.content() == expected
+    assert b"Test summary" in expected
+
+
+def test_unsupported_types_are_not_stored(tmp_path):
+    cache = DocstringFileCache(tmp_path)
+
+    def endpoint():
+        """
+        date: 2020-02-20
+        """
+        pass  # pragma: no cover
+
+    summary, schema = _plugin.parse_docstring(endpoint, cache)
+    assert str(schema["date"]) == "2020-02-20"
+    assert _marshal_files(tmp_path) == []
+
+
+def test_invalid_entry_is_ignored(tmp_path):
+    cache = DocstringFileCache(tmp_path)
+    cache.put("docstring", (None, {"key": "value"}))
+    assert cache.get("docstring") == (None, {"key": "value"})
+
+    with open(tmp_path / _marshal_files(tmp_path)[0], "wb") as file:
+        file.write(b"invalid")
+    assert cache.get("docstring") is None
+    assert cache.get("unknown") is None
+
+
+def test_oldest_entries_are_removed(tmp_path):
+    cache = DocstringFileCache(tmp_path, max_entries=10)
+    for index in range(10):
+        cache.put(f"docstring {index}", (None, {"index": index}))
+        os.utime(cache._path(f"docstring {index}"), (index, index))
+    assert len(_marshal_files(tmp_path)) == 10
+
+    cache.put("docstring 10", (None, {"index": 10}))
+    assert len(_marshal_files(tmp_path)) == 9
+    assert cache.get("docstring 0") is None
+    assert cache.get("docstring 1") is None
+    assert cache.get("docstring 2") == (None, {"index": 2})
+    assert cache.get("docstring 10") == (None, {"index": 10})
+
+    # Existing entries are counted
+    assert DocstringFileCache(tmp_path)._entries == 9
+
+
+def test_storage_failure_is_ignored(tmp_path, monkeypatch, application):
+    _plugin._parse_docstring.cache_clear()
+    cache = DocstringFileCache(tmp_path)
+
+    def replace(source, destination):
+        raise PermissionError("Read-only file system")
+
+    monkeypatch.setattr(os, "replace", replace)
+    spec = StarletteAPISpec(
+        application, title="Test API", version="1.0.0", docstring_cache=cache
+    )
+    assert spec.document()["paths"]["/test"]["get"]["summary"] == "Test summary"
+    # Temporary files are removed
+    assert os.listdir(tmp_path) == []
+
+
+def test_directory_failure_is_ignored(tmp_path, monkeypatch):
+    cache = DocstringFileCache(tmp_path)
+
+    def mkstemp(**kwargs):
+        raise OSError("No space left on device")
+
+    monkeypatch.setattr(tempfile, "mkstemp", mkstemp)
+    cache.put("docstring", ("summary", {}))
+    assert os.listdir(tmp_path) == []
@@ -1,9 +1,13 @@
+import json
+
 from apispec import APISpec
 from starlette.applications import Starlette
 
 from apispec_starlette import (
     StarlettePlugin,
+    StarletteAPISpec,
     document_response,
+    document_responses,
     document_oauth2_authentication,
     document_endpoint_oauth2_authentication,
 )
@@ -179,3 +183,158 @@ def test_endpoint_oauth2_authentication_full_documentation():
         },
         "swagger": "2.0",
     }
+
+
+def _bulk_spec() -> StarletteAPISpec:
+    app = Starlette()
+
+    @app.route("/test", methods=["GET", "POST"])
+    def test_endpoint(request):
+        pass  # pragma: no cover
+
+    @app.route("/other")
+    def other_endpoint(request):
+        pass  # pragma: no cover
+
+    return StarletteAPISpec(app, title="Test API", version="0.0.1")
+
+
+BULK_PATHS = {
+    "/test": {
+        "get": {
+            "operationId": "get_test_endpoint",
+            "responses": {
+                "200": {"description": "ok"},
+                "404": {"description": "not found"},
+            },
+        },
+        "post": {
+            "operationId": "post_test_endpoint",
+            "responses": {"201": {"description": "created"}},
+        },
+    },
+    "/other": {
+        "get": {
+            "operationId": "get_other_endpoint",
+            "responses": {"200": {"description": "ok"}},
+        }
+    },
+}
+
+
+def test_bulk_responses_documentation():
+    spec = _bulk_spec()
+    spec.document()
+    documented_paths = []
+    spec_path = spec._document_path
+
+    def document_path(path, **kwargs):
+        documented_paths.append(path)
+        spec_path(path, **kwargs)
+
+    spec._document_path = document_path
+    document_responses(
+        spec,
+        [
+            {
+                "endpoint": "/test",
+                "method": "GET",
+                "status_code": 200,
+                "response": {"description": "ok"},
+            },
+            {
+                "endpoint": "/test",
+                "method": "get",
+                "status_code": 404,
+                "response": {"description": "not found"},
+            },
+            {
+                "endpoint": "/test",
+                "method": "post",
+                "status_code": 201,
+                "response": {"description": "created"},
+            },
+            {
+                "endpoint": "/other",
+                "method": "get",
+                "status_code": 200,
+                "response": {"description": "ok"},
+            },
+        ],
+    )
+
+    # Each path is documented once (and endpoints once again while building)
+    assert documented_paths[:2] == ["/test", "/other"]
+    assert spec.document()["paths"] == BULK_PATHS
+
+
+def test_bulk_responses_documentation_from_mapping():
+    spec = _bulk_spec()
+    document_responses(
+        spec,
+        {
+            "/test": {
+                "get": {200: {"description": "ok"}, 404: {"description": "not found"}},
+                "post": {201: {"description": "created"}},
+            },
+            "/other": {"get": {200: {"description": "ok"}}},
+        },
+    )
+    assert spec.document()["paths"] == BULK_PATHS
+
+
+def test_bulk_responses_documentation_from_yaml_file(tmp_path):
+    file_path = tmp_path / "responses.yaml"
+    file_path.write_text("""
+/test:
+    get:
+        200:
+            description: ok
+        404:
+            description: not found
+    post:
+        201:
+            description: created
+/other:
+    get:
+        200:
+            description: ok
+""")
+    spec = _bulk_spec()
+    document_responses(spec, file_path)
+    assert spec.document()["paths"] == BULK_PATHS
+
+
+def test_bulk_responses_documentation_from_json_file(tmp_path):
+    file_path = tmp_path / "responses.json"
+    file_path.write_text(
+        json.dumps(
+            {
+                "/test": {
+                    "get": {
+                        "200": {"description": "ok"},
+                        "404": {"description": "not found"},
+                    },
+                    "post": {"201": {"description": "created"}},
+                },
+                "/other": {"get": {"200": {"description": "ok"}}},
+            }
+        )
+    )
+    spec = _bulk_spec()
+    document_responses(spec, str(file_path))
+    assert spec.document()["paths"] == BULK_PATHS
+
+
+def test_bulk_responses_documentation_with_apispec():
+    app = Starlette()
+    spec = APISpec(
+        title="Test API",
+        version="0.0.1",
+        openapi_version="2.0",
+        plugins=[StarlettePlugin(app)],
+    )
+    document_responses(spec, {"/test": {"get": {200: {"description": "ok"}}}})
+    assert spec.to_dict()["paths"] == {
+        "/test": {"get": {"responses": {"200": {"description": "ok"}}}}
+    }
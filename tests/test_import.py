@@ -0,0 +1,30 @@
+import subprocess
+import sys
+
+
+def _run(code: str) -> str:
+    return subprocess.run(
+        [sys.executable, "-c", code],
+        check=True,
+        stdout=subprocess.PIPE,
+        universal_newlines=True,
+    ).stdout
+
+
+def test_import_does_not_load_yaml():
+    output = _run(
+        "import sys, apispec_starlette; "
+        "print([name for name in ('yaml', 'starlette.schemas') if name in sys.modules])"
+    )
+    assert output.splitlines()[-1] == "[]"
+
+
+def test_add_swagger_json_endpoint_does_not_load_yaml():
+    output = _run(
+        "import sys; "
+        "from starlette.applications import Starlette; "
+        "from apispec_starlette import add_swagger_json_endpoint; "
+        "add_swagger_json_endpoint(Starlette()); "
+        "print('yaml' in sys.modules)"
+    )
+    assert output.splitlines()[-1] == "False"
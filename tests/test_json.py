@@ -0,0 +1,105 @@
+import importlib.util
+import json
+import sys
+
+import pytest
+from starlette.applications import Starlette
+
+from apispec_starlette import StarletteAPISpec, document_response
+from apispec_starlette import _json
+from apispec_starlette._json import json_encoder, orjson_dumps, stdlib_dumps
+
+
+@pytest.fixture
+def app(application) -> Starlette:
+    @application.route("/test/{identifier}", methods=["GET", "POST"])
+    def test_endpoint(request):
+        """
+        Summary with unicode: é
+        ---
+        parameters:
+            - name: identifier
+              in: path
+              type: integer
+        responses:
+            200:
+                description: "ok"
+                schema:
+                    type: number
+                    example: 1.5
+        """
+        pass  # pragma: no cover
+
+    return application
+
+
+def _spec(app: Starlette, **kwargs) -> StarletteAPISpec:
+    spec = StarletteAPISpec(app, title="Test API", version="1.0.0", **kwargs)
+    document_response(
+        spec,
+        endpoint="/test/{identifier}",
+        method="get",
+        status_code=404,
+        response={"description": "not found", "x-enabled": True, "x-none": None},
+    )
+    return spec
+
+
+def test_orjson_is_used_by_default(app):
+    pytest.importorskip("orjson")
+    assert json_encoder(None) is orjson_dumps
+    assert _spec(app).json_encoder is orjson_dumps
+
+
+def test_orjson_and_stdlib_outputs_are_identical(app):
+    pytest.importorskip("orjson")
+    orjson_content = _spec(app, json_encoder="orjson").content()
+    stdlib_content = _spec(app, json_encoder="json").content()
+    assert orjson_content == stdlib_content
+    assert json.loads(orjson_content)["responses"] == {
+        "400": {"schema": {"$ref": "#/definitions/Error400"}}
+    }
+
+
+def test_stdlib_is_used_if_orjson_is_not_installed(monkeypatch):
+    monkeypatch.setattr(_json, "orjson", None)
+    assert json_encoder(None) is stdlib_dumps
+
+    with pytest.raises(ImportError) as exception_info:
+        json_encoder("orjson")
+    assert (
+        str(exception_info.value)
+        == "orjson must be installed to be used as JSON encoder."
+    )
+
+
+def test_orjson_import_is_optional(monkeypatch):
+    # Importing orjson fails as if it was not installed
+    monkeypatch.setitem(sys.modules, "orjson", None)
+    # Load the module on its own to not alter the one used by other tests
+    module_spec = importlib.util.spec_from_file_location(
+        "_json_without_orjson", _json.__file__
+    )
+    module = importlib.util.module_from_spec(module_spec)
+    module_spec.loader.exec_module(module)
+
+    assert module.orjson is None
+    assert module.json_encoder(None) is module.stdlib_dumps
+
+
+def test_custom_json_encoder(app):
+    def dumps(obj) -> bytes:
+        return json.dumps(obj, separators=(",", ":")).encode()
+
+    spec = _spec(app, json_encoder=dumps)
+    assert spec.json_encoder is dumps
+    assert b"\\u00e9" in spec.content()
+
+
+def test_invalid_json_encoder():
+    with pytest.raises(ValueError) as exception_info:
+        json_encoder("ujson")
+    assert (
+        str(exception_info.value)
+        == "ujson is not a valid JSON encoder. Valid values are json and orjson."
+    )
@@ -0,0 +1,158 @@
+import json
+import runpy
+import sys
+
+import pytest
+import yaml
+from starlette.applications import Starlette
+
+from apispec_starlette import add_swagger_json_endpoint
+from apispec_starlette.__main__ import generate, main
+
+APPLICATION_MODULE = '''
+from starlette.applications import Starlette
+from apispec_starlette import add_swagger_json_endpoint, document_response
+
+app = Starlette()
+spec = add_swagger_json_endpoint(app, title="Test API", version="1.0.0")
+
+
+@app.route("/test")
+def test_endpoint(request):
+    """
+    responses:
+        200:
+            description: "ok"
+    """
+    pass
+
+
+document_response(
+    spec, endpoint="/test", method="get", status_code=400, response={"description": "error"}
+)
+'''
+
+
+@pytest.fixture
+def application_module(tmp_path, monkeypatch):
+    (tmp_path / "generated_application.py").write_text(APPLICATION_MODULE)
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def test_generate_from_application():
+    app = Starlette()
+
+    @app.route("/test")
+    def test_endpoint(request):
+        pass  # pragma: no cover
+
+    assert json.loads(generate(app, title="Test API", version="1.0.0")) == {
+        "info": {"title": "Test API", "version": "1.0.0"},
+        "paths": {"/test": {"get": {"operationId": "get_test_endpoint"}}},
+        "swagger": "2.0",
+    }
+
+
+def test_generate_from_spec_is_the_served_definition():
+    app = Starlette()
+    spec = add_swagger_json_endpoint(app, title="Test API")
+
+    @app.route("/test")
+    def test_endpoint(request):
+        pass  # pragma: no cover
+
+    assert generate(spec) == spec.content()
+
+
+def test_generate_from_invalid_target():
+    with pytest.raises(TypeError) as exception_info:
+        generate("not an application")
+    assert (
+        str(exception_info.value)
+        == "A Starlette application or a StarletteAPISpec is expected, got str."
+    )
+
+
+def test_main_json_output(application_module):
+    main(["generated_application:spec", "-o", "swagger.json"])
+
+    assert json.loads((application_module / "swagger.json").read_text()) == {
+        "info": {"title": "Test API", "version": "1.0.0"},
+        "paths": {
+            "/test": {
+                "get": {
+                    "operationId": "get_test_endpoint",
+                    "responses": {
+                        "200": {"description": "ok"},
+                        "400": {"description": "error"},
+                    },
+                }
+            }
+        },
+        "swagger": "2.0",
+    }
+
+
+def test_main_yaml_output(application_module):
+    main(["generated_application", "-o", "swagger.yaml", "--title", "Other API"])
+
+    assert yaml.safe_load((application_module / "swagger.yaml").read_text()) == {
+        "info": {"title": "Other API", "version": "0.0.1"},
+        "paths": {
+            "/test": {
+                "get": {
+                    "operationId": "get_test_endpoint",
+                    "responses": {"200": {"description": "ok"}},
+                }
+            }
+        },
+        "swagger": "2.0",
+    }
+
+
+def test_main_standard_output(application_module, capsysbinary):
+    main(["generated_application:app", "--format", "yaml"])
+
+    assert yaml.safe_load(capsysbinary.readouterr().out)["swagger"] == "2.0"
+
+
+def test_module_execution(application_module, capsysbinary, monkeypatch):
+    monkeypatch.setattr(sys, "argv", ["apispec_starlette", "generated_application"])
+    runpy.run_module("apispec_starlette", run_name="__main__")
+
+    assert json.loads(capsysbinary.readouterr().out)["swagger"] == "2.0"
+
+
+def test_main_json_encoder(application_module):
+    main(["generated_application", "-o", "swagger.json", "--json-encoder", "json"])
+
+    assert json.loads((application_module / "swagger.json").read_text())["info"] == {
+        "title": "My API",
+        "version": "0.0.1",
+    }
+
+
+def test_main_openapi_3_output(application_module):
+    main(["generated_application:spec", "-o", "openapi.json", "--openapi-version", "3"])
+
+    assert json.loads((application_module / "openapi.json").read_text()) == {
+        "openapi": "3.0.2",
+        "info": {"title": "Test API", "version": "1.0.0"},
+        "paths": {
+            "/test": {
+                "get": {
+                    "operationId": "get_test_endpoint",
+                    "responses": {
+                        "200": {"description": "ok"},
+                        "400": {"description": "error"},
+                    },
+                }
+            }
+        },
+    }
+
+    main(["generated_application:spec", "-o", "openapi.yaml", "--openapi-version", "3"])
+    assert yaml.safe_load((application_module / "openapi.yaml").read_text()) == (
+        json.loads((application_module / "openapi.json").read_text())
+    )
@@ -0,0 +1,107 @@
+from apispec_starlette import PrometheusMetrics, SpecMetrics, StarletteAPISpec
+from apispec_starlette import _plugin
+
+
+class RecordingMetrics(SpecMetrics):
+    def __init__(self):
+        self.observations = []
+
+    def observe(self, phase: str, duration: float, **counts: int):
+        assert duration >= 0
+        self.observations.append((phase, counts))
+
+
+def test_build_phases_are_observed(application):
+    @application.route("/both", methods=["GET", "POST"])
+    def both_endpoint(request):
+        """
+        Both summary
+        """
+        pass  # pragma: no cover
+
+    _plugin._parse_docstring.cache_clear()
+    metrics = RecordingMetrics()
+    spec = StarletteAPISpec(
+        application, title="Test API", version="1.0.0", metrics=metrics
+    )
+    spec.content()
+
+    assert metrics.observations == [
+        ("init_spec", {"exception_handlers": 1}),
+        ("parse_docstrings", {"docstrings": 1, "cache_hits": 0}),
+        ("discover_routes", {"routes": 3, "endpoints": 4}),
+        # Docstring of both_endpoint is parsed once for GET and POST
+        ("parse_docstrings", {"docstrings": 4, "cache_hits": 1}),
+        ("merge", {"operations": 4}),
+        ("to_dict", {"paths": 3}),
+        ("serialize", {"bytes": len(spec.content()), "cached_fragments": 0}),
+    ]
+
+
+def test_rebuild_phases_are_observed(application):
+    metrics = RecordingMetrics()
+    spec = StarletteAPISpec(
+        application, title="Test API", version="1.0.0", metrics=metrics
+    )
+    spec.content()
+    metrics.observations.clear()
+
+    spec.invalidate()
+    spec.content()
+
+    assert metrics.observations == [
+        ("discover_routes", {"routes": 2, "endpoints": 0}),
+        ("to_dict", {"paths": 2}),
+        # 2 paths and Error400 in both definitions and responses
+        ("serialize", {"bytes": len(spec.content()), "cached_fragments": 4}),
+    ]
+
+
+def test_deduplication_is_observed(application):
+    metrics = RecordingMetrics()
+    spec = StarletteAPISpec(
+        application, title="Test API", version="1.0.0", metrics=metrics, deduplicate=2
+    )
+    spec.document()
+
+    phases = [phase for phase, _ in metrics.observations]
+    assert phases[-2:] == ["to_dict", "deduplicate"]
+    assert metrics.observations[-1] == ("deduplicate", {"references": 0})
+
+
+def test_nothing_is_observed_without_metrics(application):
+    spec = StarletteAPISpec(application, title="Test API", version="1.0.0")
+    spec.content()
+    assert spec.starlette_plugin._parsing == [0.0, 0, 0]
+    assert spec.starlette_plugin._merging == [0.0, 0]
+
+
+def test_prometheus_metrics():
+    metrics = PrometheusMetrics()
+    metrics.observe("to_dict", 0.5, paths=2)
+    metrics.observe("to_dict", 0.25, paths=2)
+    metrics.observe("init_spec", 0.125)
+
+    assert metrics.render() == (
+        "# HELP apispec_starlette_phase_duration_seconds Time spent building the OpenAPI definition, per phase.\n"
+        "# TYPE apispec_starlette_phase_duration_seconds summary\n"
+        'apispec_starlette_phase_duration_seconds_count{phase="to_dict"} 2\n'
+        'apispec_starlette_phase_duration_seconds_sum{phase="to_dict"} 0.75\n'
+        'apispec_starlette_phase_duration_seconds_count{phase="init_spec"} 1\n'
+        'apispec_starlette_phase_duration_seconds_sum{phase="init_spec"} 0.125\n'
+        "# HELP apispec_starlette_phase_last_duration_seconds Time spent during the last occurrence of a phase.\n"
+        "# TYPE apispec_starlette_phase_last_duration_seconds gauge\n"
+        'apispec_starlette_phase_last_duration_seconds{phase="to_dict"} 0.25\n'
+        'apispec_starlette_phase_last_duration_seconds{phase="init_spec"} 0.125\n'
+        "# HELP apispec_starlette_phase_items_total Number of items processed, per phase and kind of item.\n"
+        "# TYPE apispec_starlette_phase_items_total counter\n"
+        'apispec_starlette_phase_items_total{phase="to_dict",item="paths"} 4\n'
+    )
+
+
+def test_prometheus_metrics_prefix():
+    metrics = PrometheusMetrics(prefix="my_api")
+    metrics.observe("serialize", 1.0, bytes=10)
+    assert 'my_api_phase_items_total{phase="serialize",item="bytes"} 10\n' in (
+        metrics.render()
+    )
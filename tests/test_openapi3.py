@@ -0,0 +1,406 @@
+import copy
+
+from apispec_starlette._openapi3 import to_openapi3
+
+SWAGGER = {
+    "swagger": "2.0",
+    "info": {"title": "Test API", "version": "1.0.0"},
+    "host": "example.com",
+    "basePath": "/api",
+    "schemes": ["https"],
+    "produces": ["application/json"],
+    "paths": {
+        "/users/{user_id}": {
+            "parameters": [
+                {"name": "user_id", "in": "path", "required": True, "type": "integer"}
+            ],
+            "get": {
+                "operationId": "get_user",
+                "parameters": [
+                    {
+                        "name": "fields",
+                        "in": "query",
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "collectionFormat": "multi",
+                    }
+                ],
+                "responses": {
+                    "200": {
+                        "description": "user",
+                        "schema": {"$ref": "#/definitions/User"},
+                        "headers": {"X-Rate-Limit": {"type": "integer"}},
+                    },
+                    "400": {"$ref": "#/responses/400"},
+                },
+                "security": [{"oauth2": ["read"]}],
+            },
+            "put": {
+                "consumes": ["application/json"],
+                "parameters": [
+                    {
+                        "name": "body",
+                        "in": "body",
+                        "required": True,
+                        "description": "user",
+                        "schema": {"$ref": "#/definitions/User"},
+                    }
+                ],
+                "responses": {"204": {"description": "updated"}},
+            },
+            "post": {
+                "consumes": ["multipart/form-data"],
+                "parameters": [
+                    {
+                        "name": "avatar",
+                        "in": "formData",
+                        "type": "file",
+                        "required": True,
+                        "description": "image",
+                    }
+                ],
+                "responses": {"204": {"description": "uploaded"}},
+            },
+        }
+    },
+    "definitions": {
+        "User": {"type": "object", "properties": {"name": {"type": "string"}}},
+        "Error400": {"type": "object"},
+    },
+    "responses": {"400": {"schema": {"$ref": "#/definitions/Error400"}}},
+    "securityDefinitions": {
+        "oauth2": {
+            "type": "oauth2",
+            "flow": "implicit",
+            "authorizationUrl": "https://example.com/authorize",
+            "scopes": {"read": "Read access"},
+        },
+        "basic": {"type": "basic"},
+    },
+}
+
+
+def test_swagger_definition_conversion():
+    document = copy.deepcopy(SWAGGER)
+    assert to_openapi3(document) == {
+        "openapi": "3.0.2",
+        "info": {"title": "Test API", "version": "1.0.0"},
+        "servers": [{"url": "https://example.com/api"}],
+        "paths": {
+            "/users/{user_id}": {
+                "parameters": [
+                    {
+                        "name": "user_id",
+                        "in": "path",
+                        "required": True,
+                        "schema": {"type": "integer"},
+                    }
+                ],
+                "get": {
+                    "operationId": "get_user",
+                    "parameters": [
+                        {
+                            "name": "fields",
+                            "in": "query",
+                            "schema": {"type": "array", "items": {"type": "string"}},
+                            "style": "form",
+                            "explode": True,
+                        }
+                    ],
+                    "responses": {
+                        "200": {
+                            "description": "user",
+                            "content": {
+                                "application/json": {
+                                    "schema": {"$ref": "#/components/schemas/User"}
+                                }
+                            },
+                            "headers": {
+                                "X-Rate-Limit": {"schema": {"type": "integer"}}
+                            },
+                        },
+                        "400": {"$ref": "#/components/responses/400"},
+                    },
+                    "security": [{"oauth2": ["read"]}],
+                },
+                "put": {
+                    "requestBody": {
+                        "content": {
+                            "application/json": {
+                                "schema": {"$ref": "#/components/schemas/User"}
+                            }
+                        },
+                        "description": "user",
+                        "required": True,
+                    },
+                    "responses": {"204": {"description": "updated"}},
+                },
+                "post": {
+                    "requestBody": {
+                        "content": {
+                            "multipart/form-data": {
+                                "schema": {
+                                    "type": "object",
+                                    "properties": {
+                                        "avatar": {
+                                            "type": "file",
+                                            "description": "image",
+                                        }
+                                    },
+                                    "required": ["avatar"],
+                                }
+                            }
+                        }
+                    },
+                    "responses": {"204": {"description": "uploaded"}},
+                },
+            }
+        },
+        "components": {
+            "schemas": {
+                "User": {"type": "object", "properties": {"name": {"type": "string"}}},
+                "Error400": {"type": "object"},
+            },
+            "responses": {
+                "400": {
+                    "content": {
+                        "application/json": {
+                            "schema": {"$ref": "#/components/schemas/Error400"}
+                        }
+                    }
+                }
+            },
+            "securitySchemes": {
+                "oauth2": {
+                    "type": "oauth2",
+                    "flows": {
+                        "implicit": {
+                            "scopes": {"read": "Read access"},
+                            "authorizationUrl": "https://example.com/authorize",
+                        }
+                    },
+                },
+                "basic": {"type": "http", "scheme": "basic"},
+            },
+        },
+    }
+    # Provided definition is not modified
+    assert document == SWAGGER
+
+
+def test_base_path_only_conversion():
+    assert to_openapi3({"swagger": "2.0", "basePath": "/api", "paths": {}}) == {
+        "openapi": "3.0.2",
+        "paths": {},
+        "servers": [{"url": "/api"}],
+    }
+
+
+def test_openapi_3_definition_is_not_converted():
+    document = {"openapi": "3.0.2", "paths": {}}
+    assert to_openapi3(document) is document
+
+
+def test_components_conversion():
+    document = {
+        "swagger": "2.0",
+        "consumes": ["application/json"],
+        "paths": {
+            "/users": {
+                "x-owner": "users",
+                "parameters": [{"$ref": "#/parameters/Page"}],
+                "get": {
+                    "parameters": [{"$ref": "#/parameters/Page"}],
+                    "responses": {"200": {"description": "users"}},
+                },
+                "post": {
+                    "parameters": [{"$ref": "#/parameters/User"}],
+                    "responses": {"201": {"description": "created"}},
+                },
+                "put": {
+                    "consumes": ["multipart/form-data"],
+                    "parameters": [{"$ref": "#/parameters/Avatar"}],
+                    "responses": {"204": {"description": "uploaded"}},
+                },
+            }
+        },
+        "parameters": {
+            "Page": {
+                "name": "page",
+                "in": "query",
+                "type": "integer",
+                "minimum": 1,
+                "description": "page",
+            },
+            "User": {
+                "name": "body",
+                "in": "body",
+                "schema": {"$ref": "#/definitions/User"},
+            },
+            "Avatar": {"name": "avatar", "in": "formData", "type": "file"},
+        },
+        "securityDefinitions": {
+            "api_key": {
+                "type": "apiKey",
+                "name": "X-API-Key",
+                "in": "header",
+                "description": "key",
+            },
+            "basic": {"type": "basic", "description": "credentials"},
+        },
+    }
+    assert to_openapi3(document) == {
+        "openapi": "3.0.2",
+        "paths": {
+            "/users": {
+                "x-owner": "users",
+                "parameters": [{"$ref": "#/components/parameters/Page"}],
+                "get": {
+                    "parameters": [{"$ref": "#/components/parameters/Page"}],
+                    "responses": {"200": {"description": "users"}},
+                },
+                "post": {
+                    "requestBody": {"$ref": "#/components/requestBodies/User"},
+                    "responses": {"201": {"description": "created"}},
+                },
+                "put": {
+                    "requestBody": {
+                        "content": {
+                            "multipart/form-data": {
+                                "schema": {
+                                    "type": "object",
+                                    "properties": {"avatar": {"type": "file"}},
+                                }
+                            }
+                        }
+                    },
+                    "responses": {"204": {"description": "uploaded"}},
+                },
+            }
+        },
+        "components": {
+            "parameters": {
+                "Page": {
+                    "name": "page",
+                    "in": "query",
+                    "description": "page",
+                    "schema": {"type": "integer", "minimum": 1},
+                }
+            },
+            "requestBodies": {
+                "User": {
+                    "content": {
+                        "application/json": {
+                            "schema": {"$ref": "#/components/schemas/User"}
+                        }
+                    }
+                }
+            },
+            "securitySchemes": {
+                "api_key": {
+                    "type": "apiKey",
+                    "name": "X-API-Key",
+                    "in": "header",
+                    "description": "key",
+                },
+                "basic": {
+                    "type": "http",
+                    "scheme": "basic",
+                    "description": "credentials",
+                },
+            },
+        },
+    }
+
+
+def test_path_body_parameters_conversion():
+    document = {
+        "swagger": "2.0",
+        "paths": {
+            "/users": {
+                "parameters": [
+                    {"name": "body", "in": "body", "schema": {"type": "object"}},
+                    {"name": "dry_run", "in": "query", "type": "boolean"},
+                ],
+                "post": {"responses": {"201": {"description": "created"}}},
+                "put": {
+                    "parameters": [
+                        {"name": "user", "in": "body", "schema": {"type": "string"}}
+                    ],
+                    "responses": {"204": {"description": "updated"}},
+                },
+            },
+            "/avatars": {
+                "parameters": [{"name": "avatar", "in": "formData", "type": "file"}],
+                "post": {"responses": {"204": {"description": "uploaded"}}},
+            },
+        },
+    }
+    assert to_openapi3(document)["paths"] == {
+        "/users": {
+            "parameters": [
+                {"name": "dry_run", "in": "query", "schema": {"type": "boolean"}}
+            ],
+            "post": {
+                "requestBody": {
+                    "content": {"application/json": {"schema": {"type": "object"}}}
+                },
+                "responses": {"201": {"description": "created"}},
+            },
+            # Operation body parameter overrides the path one
+            "put": {
+                "requestBody": {
+                    "content": {"application/json": {"schema": {"type": "string"}}}
+                },
+                "responses": {"204": {"description": "updated"}},
+            },
+        },
+        "/avatars": {
+            "post": {
+                "requestBody": {
+                    "content": {
+                        "application/x-www-form-urlencoded": {
+                            "schema": {
+                                "type": "object",
+                                "properties": {"avatar": {"type": "file"}},
+                            }
+                        }
+                    }
+                },
+                "responses": {"204": {"description": "uploaded"}},
+            }
+        },
+    }
+
+
+def test_form_data_conversion_without_form_media_type():
+    document = {
+        "swagger": "2.0",
+        "paths": {
+            "/upload": {
+                "post": {
+                    "parameters": [
+                        {"name": "name", "in": "formData", "type": "string"},
+                        {"name": "tags", "in": "formData", "type": "array"},
+                    ],
+                    "responses": {"204": {"description": "uploaded"}},
+                }
+            }
+        },
+    }
+    assert to_openapi3(document)["paths"]["/upload"]["post"] == {
+        "requestBody": {
+            "content": {
+                "application/x-www-form-urlencoded": {
+                    "schema": {
+                        "type": "object",
+                        "properties": {
+                            "name": {"type": "string"},
+                            "tags": {"type": "array"},
+                        },
+                    }
+                }
+            }
+        },
+        "responses": {"204": {"description": "uploaded"}},
+    }
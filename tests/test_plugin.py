@@ -2,8 +2,14 @@ from apispec import APISpec
 from starlette.applications import Starlette
 from starlette.exceptions import HTTPException
 from starlette.requests import Request
+from starlette.routing import Router
 
-from apispec_starlette import StarlettePlugin, document_endpoint_oauth2_authentication
+from apispec_starlette import (
+    StarlettePlugin,
+    document_endpoint_oauth2_authentication,
+    document_response,
+)
+from apispec_starlette._plugin import _parse_docstring, parse_docstring, merge_dict
 
 
 def test_without_exception_handlers_in_app():
@@ -318,3 +324,231 @@ def test_path_summary():
         },
         "swagger": "2.0",
     }
+
+
+def test_docstring_is_parsed_once():
+    app = Starlette()
+    plugin = StarlettePlugin(app)
+    spec = APISpec(
+        title="Test API", version="0.0.1", openapi_version="2.0", plugins=[plugin]
+    )
+
+    @app.route("/test", methods=["GET", "POST"])
+    def test_endpoint(request):
+        """
+        This is a unique summary for caching purpose
+        ---
+        responses:
+            200:
+                description: "ok"
+        """
+        pass  # pragma: no cover
+
+    misses = _parse_docstring.cache_info().misses
+    for endpoint in plugin.endpoints():
+        spec.path(endpoint.path, endpoint=endpoint)
+    assert _parse_docstring.cache_info().misses == misses + 1
+
+    operation = {
+        "operationId": "get_test_endpoint",
+        "summary": "This is a unique summary for caching purpose",
+        "responses": {"200": {"description": "ok"}},
+    }
+    assert spec.to_dict()["paths"]["/test"]["get"] == operation
+    assert spec.to_dict()["paths"]["/test"]["post"] == {
+        **operation,
+        "operationId": "post_test_endpoint",
+    }
+
+
+def test_parsed_docstring_can_be_modified():
+    def endpoint():
+        """
+        responses:
+            200:
+                description: "ok"
+        """
+        pass  # pragma: no cover
+
+    summary, schema = parse_docstring(endpoint)
+    assert summary is None
+    schema["responses"][200]["description"] = "modified"
+    assert parse_docstring(endpoint) == (
+        None,
+        {"responses": {200: {"description": "ok"}}},
+    )
+
+
+def test_new_endpoints_only_returns_undocumented_endpoints():
+    app = Starlette()
+    plugin = StarlettePlugin(app)
+    APISpec(title="Test API", version="0.0.1", openapi_version="2.0", plugins=[plugin])
+
+    @app.route("/test")
+    def test_endpoint(request):
+        pass  # pragma: no cover
+
+    assert [endpoint.path for endpoint in plugin.new_endpoints()] == ["/test"]
+    assert plugin.new_endpoints() == []
+
+    async def sub_endpoint(request):
+        pass  # pragma: no cover
+
+    sub_application = Router()
+    app.mount("/sub", sub_application)
+    assert plugin.new_endpoints() == []
+
+    sub_application.add_route("/test", sub_endpoint, methods=["GET", "POST"])
+    assert sorted(
+        (endpoint.path, endpoint.http_method) for endpoint in plugin.new_endpoints()
+    ) == [("/sub/test", "get"), ("/sub/test", "post")]
+    assert plugin.new_endpoints() == []
+
+
+def test_new_endpoints_returns_endpoints_of_documented_paths():
+    app = Starlette()
+    plugin = StarlettePlugin(app)
+    spec = APISpec(
+        title="Test API", version="0.0.1", openapi_version="2.0", plugins=[plugin]
+    )
+
+    @app.route("/test")
+    def test_endpoint(request):
+        pass  # pragma: no cover
+
+    @app.route("/test_other")
+    def test_other_endpoint(request):
+        pass  # pragma: no cover
+
+    for endpoint in plugin.new_endpoints():
+        spec.path(endpoint.path, endpoint=endpoint)
+
+    document_response(
+        spec,
+        endpoint="/test",
+        method="get",
+        status_code=200,
+        response={"description": "ok"},
+    )
+    new_endpoints = plugin.new_endpoints()
+    assert [endpoint.path for endpoint in new_endpoints] == ["/test"]
+
+    for endpoint in new_endpoints:
+        spec.path(endpoint.path, endpoint=endpoint)
+
+    assert spec.to_dict()["paths"] == {
+        "/test": {
+            "get": {
+                "operationId": "get_test_endpoint",
+                "responses": {"200": {"description": "ok"}},
+            }
+        },
+        "/test_other": {"get": {"operationId": "get_test_other_endpoint"}},
+    }
+
+
+def test_merge_dict_is_deep():
+    previous = {
+        "operationId": "get_test",
+        "responses": {"200": {"description": "ok", "schema": {"type": "string"}}},
+        "parameters": [{"name": "first"}],
+    }
+    new = {
+        "responses": {"200": {"description": "success"}, "404": {"description": ""}},
+        "parameters": [{"name": "second"}],
+    }
+    assert merge_dict(previous, new) == {
+        "operationId": "get_test",
+        "responses": {
+            "200": {"description": "success", "schema": {"type": "string"}},
+            "404": {"description": ""},
+        },
+        "parameters": [{"name": "second"}],
+    }
+
+
+def test_merge_dict_does_not_modify_inputs():
+    previous = {"responses": {"200": {"description": "ok"}}, "tags": ["first"]}
+    new = {"responses": {"404": {"description": "not found"}}, "security": []}
+    merged = merge_dict(previous, new)
+
+    assert previous == {"responses": {"200": {"description": "ok"}}, "tags": ["first"]}
+    assert new == {"responses": {"404": {"description": "not found"}}, "security": []}
+    # Unmodified branches are shared
+    assert merged["tags"] is previous["tags"]
+    assert merged["security"] is new["security"]
+    assert merged["responses"]["200"] is previous["responses"]["200"]
+    assert merged["responses"]["404"] is new["responses"]["404"]
+    # Nothing to merge
+    assert merge_dict(previous, {}) is previous
+    assert merge_dict(previous, {"tags": previous["tags"]}) is previous
+
+
+def test_documented_operations_are_merged_on_every_build():
+    app = Starlette()
+    plugin = StarlettePlugin(app)
+    spec = APISpec(
+        title="Test API", version="0.0.1", openapi_version="2.0", plugins=[plugin]
+    )
+
+    @app.route("/test")
+    def test_endpoint(request):
+        pass  # pragma: no cover
+
+    document_endpoint_oauth2_authentication(
+        spec, endpoint="/test", method="get", required_scopes=["scope"]
+    )
+    document_response(
+        spec,
+        endpoint="/test",
+        method="get",
+        status_code=200,
+        response={"description": "ok"},
+    )
+    expected = {
+        "operationId": "get_test_endpoint",
+        "responses": {
+            "200": {"description": "ok"},
+            "401": {
+                "description": "No permission -- see authorization schemes",
+                "schema": {"type": "string"},
+            },
+            "403": {
+                "description": "Request forbidden -- authorization will not help",
+                "schema": {"type": "string"},
+            },
+        },
+        "security": [{"oauth2": ["scope"]}],
+    }
+    for _ in range(2):
+        for endpoint in plugin.endpoints():
+            spec.path(endpoint.path, endpoint=endpoint)
+        assert spec.to_dict()["paths"]["/test"]["get"] == expected
+
+
+def test_exception_handlers_with_openapi_3():
+    async def handle_exception(request: Request, exc: HTTPException):
+        """
+        type: object
+        """
+        pass  # pragma: no cover
+
+    app = Starlette(exception_handlers={400: handle_exception})
+    spec = APISpec(
+        title="Test API",
+        version="0.0.1",
+        openapi_version="3.0.2",
+        plugins=[StarlettePlugin(app)],
+    )
+    assert spec.to_dict()["components"] == {
+        "schemas": {"Error400": {"type": "object"}},
+        "responses": {
+            400: {
+                "content": {
+                    "application/json": {
+                        "schema": {"$ref": "#/components/schemas/Error400"}
+                    }
+                }
+            }
+        },
+    }
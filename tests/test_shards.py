@@ -0,0 +1,320 @@
+import json
+
+import pytest
+from starlette.applications import Starlette
+from starlette.routing import Mount, Route, Router
+
+from apispec_starlette import StarletteAPISpec, document_response
+from apispec_starlette._shards import (
+    OperationIndex,
+    group_by_mount,
+    group_by_tag,
+    partial_document,
+    shard_document,
+)
+
+
+def _endpoint(name: str, docstring: str = None):
+    def endpoint(request):
+        pass  # pragma: no cover
+
+    endpoint.__name__ = name
+    endpoint.__doc__ = docstring
+    return endpoint
+
+
+USERS_DOCSTRING = """
+tags:
+    - users
+responses:
+    200:
+        description: "user"
+        schema:
+            $ref: "#/definitions/User"
+"""
+
+
+def _application() -> Starlette:
+    app = Starlette()
+    app.add_route("/health", _endpoint("health"))
+    app.routes.append(
+        Mount(
+            "/users",
+            routes=[
+                Route("/{user_id}", _endpoint("user", USERS_DOCSTRING)),
+                Mount("/admin", routes=[Route("/", _endpoint("admin"))]),
+            ],
+        )
+    )
+    app.routes.append(
+        Mount("/billing", app=Router([Route("/invoices", _endpoint("invoices"))]))
+    )
+    return app
+
+
+def _spec() -> StarletteAPISpec:
+    spec = StarletteAPISpec(_application(), title="Test API", version="1.0.0")
+    spec.components.schema(
+        "User",
+        {
+            "type": "object",
+            "properties": {"address": {"$ref": "#/definitions/Address"}},
+        },
+    )
+    spec.components.schema("Address", {"type": "object"})
+    spec.components.schema("Invoice", {"type": "object"})
+    return spec
+
+
+def test_shards_per_mount():
+    spec = _spec()
+    assert spec.shards("mount") == {
+        "default": ["/health"],
+        "users": ["/users/{user_id}", "/users/admin/"],
+        "billing": ["/billing/invoices"],
+    }
+
+    users = json.loads(spec.shard("users", "mount").content)
+    assert sorted(users["paths"]) == ["/users/admin/", "/users/{user_id}"]
+    # Only referenced components are kept (directly or not)
+    assert sorted(users["definitions"]) == ["Address", "User"]
+    assert json.loads(spec.shard("billing", "mount").content)["definitions"] == {}
+    assert spec.shard("unknown", "mount") is None
+
+
+def test_shards_per_tag():
+    spec = _spec()
+    document_response(
+        spec,
+        endpoint="/billing/invoices",
+        method="get",
+        status_code=200,
+        response={"description": "invoices"},
+    )
+    assert spec.shards("tag") == {
+        "default": ["/billing/invoices", "/health", "/users/admin/"],
+        "users": ["/users/{user_id}"],
+    }
+    assert json.loads(spec.shard("users", "tag").content)["paths"] == {
+        "/users/{user_id}": {
+            "get": {
+                "operationId": "get_user",
+                "tags": ["users"],
+                "responses": {
+                    "200": {
+                        "description": "user",
+                        "schema": {"$ref": "#/definitions/User"},
+                    }
+                },
+            }
+        }
+    }
+
+
+def test_shards_are_encoded_once():
+    spec = _spec()
+    assert spec.shard("users", "mount") is spec.shard("users", "mount")
+    spec.invalidate()
+    assert spec._snapshot.shards == {}
+
+
+def test_shards_index():
+    assert json.loads(_spec().shards_index("mount").content) == {
+        "shards": [
+            {"name": "default", "url": "default.json", "paths": 1},
+            {"name": "users", "url": "users.json", "paths": 2},
+            {"name": "billing", "url": "billing.json", "paths": 1},
+        ]
+    }
+
+
+def test_shards_named_index_are_renamed():
+    app = Starlette()
+    app.add_route("/index", _endpoint("index", "tags:\n    - index"))
+    app.add_route("/index_", _endpoint("index_", "tags:\n    - index_"))
+    app.routes.append(Mount("/index", routes=[Route("/", _endpoint("mounted"))]))
+    spec = StarletteAPISpec(app, title="Test API", version="1.0.0")
+
+    # index (and names derived from it) is reserved for the shards index
+    assert spec.shards("tag") == {
+        "index_": ["/index"],
+        "index__": ["/index_"],
+        "default": ["/index/"],
+    }
+    assert list(json.loads(spec.shard("index_", "tag").content)["paths"]) == ["/index"]
+    assert list(json.loads(spec.shard("index__", "tag").content)["paths"]) == [
+        "/index_"
+    ]
+    assert spec.shard("index", "tag") is None
+    assert spec.shards("mount") == {
+        "default": ["/index", "/index_"],
+        "index_": ["/index/"],
+    }
+
+
+def test_unresolved_references_are_ignored():
+    document = {
+        "info": {"title": "Test API"},
+        "paths": {
+            "/users": {
+                "parameters": [{"$ref": "#/info/title/name"}],
+                "get": {"responses": {"200": {"schema": {"$ref": "user.json#/User"}}}},
+            }
+        },
+        "definitions": {"User": {"type": "object"}},
+    }
+    partial = partial_document(document, {"/users": None})
+    assert partial["paths"] == document["paths"]
+    assert partial["definitions"] == {}
+
+
+def test_invalid_kind_of_shard():
+    with pytest.raises(ValueError) as exception_info:
+        _spec().shards("path")
+    assert (
+        str(exception_info.value)
+        == "path is not a valid kind of shard. Valid values are mount and tag."
+    )
+
+
+def test_operations_with_many_tags():
+    paths = {
+        "/first": {"get": {"tags": ["a", "b"]}, "post": {"tags": ["a"]}},
+        "/second": {"get": {}, "parameters": []},
+    }
+    assert group_by_tag(paths) == {
+        "a": ["/first"],
+        "b": ["/first"],
+        "default": ["/second"],
+    }
+    assert shard_document({"paths": paths}, ["/first"], tag="b") == {
+        "paths": {"/first": {"get": {"tags": ["a", "b"]}}}
+    }
+
+
+def test_most_specific_mount_is_used():
+    assert group_by_mount(
+        ["/api/v1/test", "/api/test", "/apitest"], ["/api", "/api/v1"]
+    ) == {
+        "api-v1": ["/api/v1/test"],
+        "api": ["/api/test"],
+        "default": ["/apitest"],
+    }
+
+
+def test_openapi_3_components():
+    document = {
+        "paths": {
+            "/test": {
+                "get": {"responses": {"200": {"$ref": "#/components/responses/Ok"}}}
+            }
+        },
+        "components": {
+            "responses": {
+                "Ok": {
+                    "content": {
+                        "application/json": {
+                            "schema": {"$ref": "#/components/schemas/Result"}
+                        }
+                    }
+                },
+                "Unused": {},
+            },
+            "schemas": {"Result": {"type": "object"}, "Unused": {}},
+            "securitySchemes": {"oauth2": {"type": "oauth2"}},
+        },
+    }
+    shard = shard_document(document, ["/test"])
+    assert shard["components"] == {
+        "responses": {"Ok": document["components"]["responses"]["Ok"]},
+        "schemas": {"Result": {"type": "object"}},
+        "securitySchemes": {"oauth2": {"type": "oauth2"}},
+    }
+    # Provided definition is not modified
+    assert "Unused" in document["components"]["schemas"]
+
+
+INDEXED_PATHS = {
+    "/users": {
+        "get": {"tags": ["users"]},
+        "post": {"tags": ["users", "admin"]},
+    },
+    "/users/{user_id}": {"get": {"tags": ["users"]}, "parameters": []},
+    "/invoices": {"get": {"tags": ["billing"]}, "delete": {}},
+}
+
+
+def test_operation_index_selection():
+    index = OperationIndex(INDEXED_PATHS)
+    assert index.select() == {
+        "/users": ["get", "post"],
+        "/users/{user_id}": ["get"],
+        "/invoices": ["get", "delete"],
+    }
+    assert index.select(paths=["/users*"], methods=["get"]) == {
+        "/users": ["get"],
+        "/users/{user_id}": ["get"],
+    }
+    assert index.select(tags=["admin", "billing"]) == {
+        "/users": ["post"],
+        "/invoices": ["get"],
+    }
+    assert index.select(paths=["/users"], tags=["billing"]) == {}
+    assert index.select(tags=["unknown"]) == {}
+
+
+def test_operation_index_is_built_once():
+    spec = _spec()
+    index = spec.operation_index()
+    assert index.select(tags=["users"]) == {"/users/{user_id}": ["get"]}
+    assert spec.operation_index() is index
+    spec.invalidate()
+    assert spec.operation_index() is not index
+
+
+def test_filtered_definition():
+    spec = _spec()
+    filtered = spec.filtered(paths=["/users/*"], methods=["GET"])
+    document = json.loads(filtered.content)
+    assert sorted(document["paths"]) == ["/users/admin/", "/users/{user_id}"]
+    assert sorted(document["definitions"]) == ["Address", "User"]
+    # Filters are normalized
+    assert spec.filtered(methods=["get", "GET"], paths=["/users/*"]) is filtered
+
+    assert json.loads(spec.filtered(tags=["users"], base_path="/api").content) == {
+        "info": {"title": "Test API", "version": "1.0.0"},
+        "swagger": "2.0",
+        "definitions": {
+            "User": {
+                "type": "object",
+                "properties": {"address": {"$ref": "#/definitions/Address"}},
+            },
+            "Address": {"type": "object"},
+        },
+        "paths": {
+            "/users/{user_id}": {
+                "get": {
+                    "operationId": "get_user",
+                    "tags": ["users"],
+                    "responses": {
+                        "200": {
+                            "description": "user",
+                            "schema": {"$ref": "#/definitions/User"},
+                        }
+                    },
+                }
+            }
+        },
+        "basePath": "/api",
+    }
+
+
+def test_filtered_definitions_are_bounded():
+    spec = StarletteAPISpec(
+        _application(), title="Test API", version="1.0.0", max_filtered_definitions=2
+    )
+    spec.filtered(tags=["first"])
+    spec.filtered(tags=["second"])
+    spec.filtered(tags=["first"])
+    spec.filtered(tags=["third"])
+    assert [key[1] for key in spec._snapshot.filtered] == [("first",), ("third",)]
@@ -0,0 +1,213 @@
+import json
+import os
+import threading
+
+import pytest
+
+from starlette.applications import Starlette
+from starlette.testclient import TestClient
+
+from apispec_starlette import (
+    FileSpecCache,
+    StarletteAPISpec,
+    add_swagger_json_endpoint,
+    document_response,
+)
+
+
+def test_definition_is_built_by_a_single_worker(tmp_path, application):
+    app = application
+    first_worker = StarletteAPISpec(
+        app, title="Test API", version="1.0.0", shared_cache=FileSpecCache(tmp_path)
+    )
+    second_worker = StarletteAPISpec(
+        app, title="Test API", version="1.0.0", shared_cache=FileSpecCache(tmp_path)
+    )
+
+    content = first_worker.content()
+    assert second_worker.content() == content
+    # Second worker did not have to build the definition
+    assert second_worker._snapshot.document is None
+    assert json.loads(content)["paths"] == {
+        "/test": {
+            "get": {
+                "operationId": "get_test_endpoint",
+                "summary": "Test summary",
+                "responses": {"200": {"description": "ok"}},
+            }
+        },
+        "/other": {"get": {"operationId": "get_other_endpoint"}},
+    }
+    assert os.listdir(tmp_path) == [f"{first_worker.fingerprint()}.json"]
+
+
+def test_definition_is_built_by_a_single_worker_without_cache(tmp_path):
+    def worker():
+        app = Starlette()
+        spec = add_swagger_json_endpoint(
+            app, title="Test API", version="1.0.0", shared_cache=FileSpecCache(tmp_path)
+        )
+
+        @app.route("/test")
+        def test_endpoint(request):
+            """
+            responses:
+                200:
+                    description: "ok"
+            """
+            pass  # pragma: no cover
+
+        return app, spec
+
+    first_app, first_worker = worker()
+    second_app, second_worker = worker()
+
+    content = TestClient(first_app).get("/swagger.json").content
+    assert TestClient(second_app).get("/swagger.json").content == content
+    # Second worker did not have to build the definition
+    assert second_worker._snapshot.document is None
+    assert json.loads(content)["paths"] == {
+        "/test": {
+            "get": {
+                "operationId": "get_test_endpoint",
+                "responses": {"200": {"description": "ok"}},
+            }
+        }
+    }
+
+
+def test_fingerprint_depends_on_documentation(application):
+    app = application
+    spec = StarletteAPISpec(app, title="Test API", version="1.0.0")
+    fingerprint = spec.fingerprint()
+    assert (
+        StarletteAPISpec(app, title="Test API", version="1.0.0").fingerprint()
+        == fingerprint
+    )
+    assert (
+        StarletteAPISpec(app, title="Test API", version="1.0.1").fingerprint()
+        != fingerprint
+    )
+
+    document_response(
+        spec,
+        endpoint="/test",
+        method="get",
+        status_code=400,
+        response={"description": "error"},
+    )
+    assert spec.fingerprint() != fingerprint
+    fingerprint = spec.fingerprint()
+
+    @app.route("/added")
+    def added_endpoint(request):
+        pass  # pragma: no cover
+
+    assert spec.fingerprint() != fingerprint
+
+
+def test_fingerprint_depends_on_exception_handlers(application):
+    app = application
+    fingerprint = StarletteAPISpec(app, title="Test API", version="1.0.0").fingerprint()
+
+    def handler(request, exc):
+        """
+        type: object
+        """
+        pass  # pragma: no cover
+
+    app.add_exception_handler(404, handler)
+    assert (
+        StarletteAPISpec(app, title="Test API", version="1.0.0").fingerprint()
+        != fingerprint
+    )
+
+
+def test_wait_for_another_worker(tmp_path):
+    cache = FileSpecCache(tmp_path, poll_interval=0.01)
+    (tmp_path / "fingerprint.json.lock").touch()
+
+    def other_worker():
+        cache.publish("fingerprint", b'{"built":"by other worker"}')
+
+    threading.Timer(0.05, other_worker).start()
+    content = cache.get_or_build("fingerprint", lambda: b'{"built":"locally"}')
+    assert bytes(content) == b'{"built":"by other worker"}'
+
+
+def test_other_worker_failed(tmp_path):
+    cache = FileSpecCache(tmp_path, poll_interval=0.01)
+    lock = tmp_path / "fingerprint.json.lock"
+    lock.touch()
+
+    threading.Timer(0.05, lock.unlink).start()
+    content = cache.get_or_build("fingerprint", lambda: b'{"built":"locally"}')
+    assert content == b'{"built":"locally"}'
+    assert bytes(cache.get("fingerprint")) == b'{"built":"locally"}'
+
+
+def test_other_worker_is_too_slow(tmp_path):
+    cache = FileSpecCache(tmp_path, timeout=0.05, poll_interval=0.01)
+    (tmp_path / "fingerprint.json.lock").touch()
+
+    content = cache.get_or_build("fingerprint", lambda: b'{"built":"locally"}')
+    assert content == b'{"built":"locally"}'
+    assert os.listdir(tmp_path) == ["fingerprint.json"]
+
+
+def test_empty_file_is_not_a_definition(tmp_path):
+    cache = FileSpecCache(tmp_path)
+    (tmp_path / "fingerprint.json").touch()
+    assert cache.get("fingerprint") is None
+
+
+def test_failed_build_is_not_published(tmp_path):
+    cache = FileSpecCache(tmp_path)
+
+    def build():
+        raise Exception("Build failure")
+
+    with pytest.raises(Exception) as exception_info:
+        cache.get_or_build("fingerprint", build)
+    assert str(exception_info.value) == "Build failure"
+    assert os.listdir(tmp_path) == []
+
+
+def test_failed_publication_does_not_leave_temporary_file(tmp_path):
+    cache = FileSpecCache(tmp_path)
+
+    with pytest.raises(TypeError):
+        cache.publish("fingerprint", "not bytes")
+    assert os.listdir(tmp_path) == []
+
+
+def test_only_most_recent_definitions_are_kept(tmp_path):
+    cache = FileSpecCache(tmp_path, max_definitions=2)
+    for index in range(4):
+        cache.publish(f"fingerprint{index}", b"{}")
+        # Ensure distinct modification times
+        os.utime(
+            tmp_path / f"fingerprint{index}.json", ns=(index * 10**9, index * 10**9)
+        )
+
+    assert sorted(os.listdir(tmp_path)) == ["fingerprint2.json", "fingerprint3.json"]
+
+
+def test_published_definition_is_kept_even_if_older(tmp_path):
+    cache = FileSpecCache(tmp_path, max_definitions=1)
+    (tmp_path / "other.json").write_bytes(b"{}")
+    cache.publish("fingerprint", b"{}")
+    os.utime(tmp_path / "fingerprint.json", ns=(0, 0))
+    cache.publish("fingerprint", b"{}")
+
+    assert os.listdir(tmp_path) == ["fingerprint.json"]
+
+
+def test_fingerprint_depends_on_deduplication(application):
+    app = application
+    assert (
+        StarletteAPISpec(app, title="Test API", version="1.0.0").fingerprint()
+        != StarletteAPISpec(
+            app, title="Test API", version="1.0.0", deduplicate=2
+        ).fingerprint()
+    )
@@ -0,0 +1,406 @@
+import copy
+import json
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from starlette.applications import Starlette
+from starlette.endpoints import HTTPEndpoint
+from starlette.responses import Response
+from starlette.routing import Mount, Route
+from starlette.testclient import TestClient
+
+from apispec_starlette import (
+    StarletteAPISpec,
+    document_response,
+    document_responses,
+    document_oauth2_authentication,
+)
+from apispec_starlette._json import stdlib_dumps as _dumps
+
+
+def test_encoding_is_the_same_as_full_document_encoding(application):
+    spec = StarletteAPISpec(
+        application, title="Test API", version="1.0.0", host="localhost"
+    )
+    document_oauth2_authentication(
+        spec, authorization_url="http://test", flow="implicit", scopes={}
+    )
+
+    assert spec.content() == _dumps(spec.document())
+    assert json.loads(spec.content())["responses"] == {
+        "400": {"schema": {"$ref": "#/definitions/Error400"}}
+    }
+
+
+def test_only_documented_paths_are_encoded_again(application):
+    spec = StarletteAPISpec(application, title="Test API", version="1.0.0")
+    spec.content()
+    test_fragment = spec._path_fragments["/test"]
+    other_fragment = spec._path_fragments["/other"]
+
+    document_response(
+        spec,
+        endpoint="/other",
+        method="get",
+        status_code=200,
+        response={"description": "ok"},
+    )
+
+    assert json.loads(spec.content())["paths"]["/other"] == {
+        "get": {
+            "operationId": "get_other_endpoint",
+            "responses": {"200": {"description": "ok"}},
+        }
+    }
+    assert spec.content() == _dumps(spec.document())
+    assert spec._path_fragments["/test"] is test_fragment
+    assert spec._path_fragments["/other"] is not other_fragment
+
+
+def test_registered_components_are_encoded_again(application):
+    spec = StarletteAPISpec(application, title="Test API", version="1.0.0")
+    spec.content()
+
+    spec.components.schema("Other", {"type": "string"})
+    spec.invalidate()
+
+    assert json.loads(spec.content())["definitions"]["Other"] == {"type": "string"}
+    assert spec.content() == _dumps(spec.document())
+
+
+def test_refresh_builds_again_only_if_something_was_documented(application):
+    spec = StarletteAPISpec(application, title="Test API", version="1.0.0")
+    spec.refresh()
+    document = spec.document()
+    serialized = spec.serialized()
+    spec.refresh()
+    assert spec.document() is document
+    assert spec.serialized() is serialized
+
+    spec.components.schema("Other", {"type": "string"})
+    spec.refresh()
+    assert spec.document()["definitions"]["Other"] == {"type": "string"}
+    assert spec.serialized() is not serialized
+    document = spec.document()
+    spec.refresh()
+    assert spec.document() is document
+
+
+def test_oauth2_authentication_documentation_once_built(application):
+    spec = StarletteAPISpec(application, title="Test API", version="1.0.0")
+    spec.content()
+
+    document_oauth2_authentication(
+        spec, authorization_url="http://test", flow="implicit", scopes={}
+    )
+
+    assert json.loads(spec.content())["securityDefinitions"] == {
+        "oauth2": {
+            "authorizationUrl": "http://test",
+            "flow": "implicit",
+            "scopes": {},
+            "type": "oauth2",
+        }
+    }
+
+
+def test_chunked_content_is_the_same_as_content(application):
+    spec = StarletteAPISpec(application, title="Test API", version="1.0.0")
+    document_oauth2_authentication(
+        spec, authorization_url="http://test", flow="implicit", scopes={}
+    )
+
+    chunks = list(spec.iter_content(chunk_size=10))
+    assert len(chunks) > 3
+    assert all(len(chunk) >= 10 for chunk in chunks[:-1])
+    assert b"".join(chunks) == spec.content()
+    assert b"".join(spec.iter_content(base_path="/prefix")) == spec.content(
+        base_path="/prefix"
+    )
+    assert b"".join(spec.iter_content()) == spec.content()
+
+
+def _indexed_application() -> Starlette:
+    app = Starlette()
+
+    @app.route("/users/{user_id}", methods=["GET", "DELETE"], name="user")
+    def user_endpoint(request):
+        """
+        responses:
+            200:
+                description: "user"
+        """
+        return Response()
+
+    class Items(HTTPEndpoint):
+        def get(self, request):
+            """
+            responses:
+                200:
+                    description: "items"
+            """
+            return Response()
+
+    app.routes.append(Mount("/v1", routes=[Route("/items", Items, name="items")]))
+    return app
+
+
+def test_operations_are_indexed_per_route():
+    app = _indexed_application()
+    spec = StarletteAPISpec(app, title="Test API", version="1.0.0")
+    document_response(
+        spec,
+        endpoint="/users/{user_id}",
+        method="delete",
+        status_code=204,
+        response={"description": "deleted"},
+    )
+    document = spec.document()
+    user_route = app.routes[0]
+
+    user_get = document["paths"]["/users/{user_id}"]["get"]
+    assert spec.starlette_plugin.operation(user_route, "GET") is user_get
+    assert spec.starlette_plugin.operation(user_route.endpoint, "get") is user_get
+    assert spec.starlette_plugin.operation("user", "get") is user_get
+    assert spec.starlette_plugin.operation("user", "head") is user_get
+    assert spec.starlette_plugin.operation("user", "delete") == {
+        "operationId": "delete_user_endpoint",
+        "responses": {
+            "200": {"description": "user"},
+            "204": {"description": "deleted"},
+        },
+    }
+    assert spec.starlette_plugin.operation("user", "post") is None
+    assert spec.starlette_plugin.operation("unknown", "get") is None
+
+    items_get = document["paths"]["/v1/items"]["get"]
+    assert spec.starlette_plugin.operation("items", "get") is items_get
+    assert spec.starlette_plugin.operation(app.routes[1].routes[0], "get") is items_get
+
+
+def test_operation_index_is_updated_by_documentation():
+    spec = StarletteAPISpec(_indexed_application(), title="Test API", version="1.0.0")
+    spec.document()
+    document_response(
+        spec,
+        endpoint="/users/{user_id}",
+        method="get",
+        status_code=404,
+        response={"description": "not found"},
+    )
+    spec.document()
+    assert spec.starlette_plugin.operation("user", "get")["responses"] == {
+        "200": {"description": "user"},
+        "404": {"description": "not found"},
+    }
+
+
+def test_request_operation():
+    app = _indexed_application()
+    spec = StarletteAPISpec(app, title="Test API", version="1.0.0")
+    operations = []
+
+    class RecordingMiddleware:
+        def __init__(self, app):
+            self.app = app
+
+        async def __call__(self, scope, receive, send):
+            # Not routed yet
+            operations.append(spec.request_operation(scope))
+            await self.app(scope, receive, send)
+            operations.append(spec.request_operation(scope))
+
+    app.add_middleware(RecordingMiddleware)
+
+    client = TestClient(app)
+    # Definition is not built by retrieving an operation
+    client.get("/users/1")
+    assert operations == [None, None]
+    assert spec._snapshot.document is None
+
+    operations.clear()
+    spec.document()
+    client.get("/users/1")
+    client.get("/v1/items")
+    assert operations == [
+        None,
+        {
+            "operationId": "get_user_endpoint",
+            "responses": {"200": {"description": "user"}},
+        },
+        None,
+        {"operationId": "get_get", "responses": {"200": {"description": "items"}}},
+    ]
+
+    # Previous build is used until the definition is built again
+    document_response(
+        spec,
+        endpoint="/users/{user_id}",
+        method="get",
+        status_code=404,
+        response={"description": "unknown user"},
+    )
+    operations.clear()
+    client.get("/users/1")
+    assert operations[1]["responses"] == {"200": {"description": "user"}}
+    spec.document()
+    operations.clear()
+    client.get("/users/1")
+    assert operations[1]["responses"] == {
+        "200": {"description": "user"},
+        "404": {"description": "unknown user"},
+    }
+
+
+def test_request_operation_of_endpoint_served_by_many_routes():
+    def items(request):
+        return Response()
+
+    app = Starlette()
+    app.add_route("/items", items)
+    app.routes.append(Mount("/v1", routes=[Route("/items", items)]))
+    app.routes.append(Mount("/v2", routes=[Route("/items", items)]))
+    spec = StarletteAPISpec(app, title="Test API", version="1.0.0")
+    document_response(
+        spec,
+        endpoint="/v1/items",
+        method="get",
+        status_code=410,
+        response={"description": "gone"},
+    )
+    spec.document()
+    operations = {}
+
+    class RecordingMiddleware:
+        def __init__(self, app):
+            self.app = app
+
+        async def __call__(self, scope, receive, send):
+            await self.app(scope, receive, send)
+            operations[scope["root_path"] + scope["path"]] = spec.request_operation(
+                scope
+            )
+
+    app.add_middleware(RecordingMiddleware)
+
+    client = TestClient(app)
+    for path in ("/items", "/v1/items", "/v2/items"):
+        client.get(path)
+    assert operations == {
+        "/items": {"operationId": "get_items"},
+        "/v1/items": {
+            "operationId": "get_items",
+            "responses": {"410": {"description": "gone"}},
+        },
+        "/v2/items": {"operationId": "get_items"},
+    }
+    assert spec.starlette_plugin.operation(app.routes[1].routes[0], "get") == {
+        "operationId": "get_items",
+        "responses": {"410": {"description": "gone"}},
+    }
+    # Endpoint is ambiguous
+    assert spec.starlette_plugin.operation(items, "get") is None
+
+
+def test_published_definition_is_not_modified_by_documentation(application):
+    spec = StarletteAPISpec(application, title="Test API", version="1.0.0")
+    document = spec.document()
+    expected = copy.deepcopy(document)
+
+    document_response(
+        spec,
+        endpoint="/test",
+        method="get",
+        status_code=404,
+        response={"description": "not found"},
+    )
+    document_oauth2_authentication(
+        spec, authorization_url="http://test", flow="implicit", scopes={}
+    )
+    spec.path("/documented", operations={"get": {"summary": "documented"}})
+
+    assert document == expected
+    rebuilt = spec.document()
+    assert rebuilt["paths"]["/test"]["get"]["responses"]["404"] == {
+        "description": "not found"
+    }
+    assert "oauth2" in rebuilt["securityDefinitions"]
+    assert "/documented" in rebuilt["paths"]
+
+
+def test_published_openapi_3_definition_is_not_modified_by_documentation(
+    application,
+):
+    spec = StarletteAPISpec(
+        application, title="Test API", version="1.0.0", openapi_version="3.0.2"
+    )
+    document = spec.document()
+    expected = copy.deepcopy(document)
+
+    spec.components.schema("Other", {"type": "string"})
+    spec.invalidate()
+
+    assert document == expected
+    assert spec.document()["components"]["schemas"]["Other"] == {"type": "string"}
+
+
+def test_concurrent_first_build_is_shared(application):
+    spec = StarletteAPISpec(application, title="Test API", version="1.0.0")
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        documents = list(executor.map(lambda _: spec.document(), range(32)))
+    assert all(document is documents[0] for document in documents)
+
+
+def test_concurrent_fetches_and_documentation(application):
+    spec = StarletteAPISpec(application, title="Test API", version="1.0.0")
+    registrations = 50
+
+    def register(index: int):
+        # Both responses are documented at once, they must always be seen together
+        document_responses(
+            spec,
+            {
+                "/test": {
+                    "get": {
+                        1000 + index: {"description": f"first {index}"},
+                        2000 + index: {"description": f"second {index}"},
+                    }
+                }
+            },
+        )
+        spec.path(f"/added{index}", operations={"get": {"summary": f"{index}"}})
+
+    def check(responses: dict):
+        for index in range(registrations):
+            assert (str(1000 + index) in responses) == (str(2000 + index) in responses)
+
+    def fetch(index: int):
+        check(json.loads(spec.content())["paths"]["/test"]["get"]["responses"])
+        check(spec.document()["paths"]["/test"]["get"]["responses"])
+        document = json.loads(spec.content(base_path=f"/base{index % 4}"))
+        assert document["basePath"] == f"/base{index % 4}"
+        check(document["paths"]["/test"]["get"]["responses"])
+        filtered = json.loads(spec.filtered(paths=["/test"]).content)
+        assert list(filtered["paths"]) == ["/test"]
+        check(filtered["paths"]["/test"]["get"]["responses"])
+        check(spec.openapi3()["paths"]["/test"]["get"]["responses"])
+
+    switch_interval = sys.getswitchinterval()
+    # Switch threads as often as possible to interleave readers and writers
+    sys.setswitchinterval(1e-6)
+    try:
+        with ThreadPoolExecutor(max_workers=16) as executor:
+            futures = [
+                executor.submit(register, index) for index in range(registrations)
+            ]
+            futures += [executor.submit(fetch, index) for index in range(200)]
+            for future in futures:
+                future.result()
+    finally:
+        sys.setswitchinterval(switch_interval)
+
+    document = json.loads(spec.content())
+    responses = document["paths"]["/test"]["get"]["responses"]
+    assert len(responses) == 1 + 2 * registrations
+    assert all(f"/added{index}" in document["paths"] for index in range(registrations))
+    assert spec.content() == _dumps(spec.document())
@@ -1,8 +1,20 @@
+import asyncio
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
 from apispec import BasePlugin
 from starlette.applications import Starlette
+from starlette.routing import Mount, Route
 from starlette.testclient import TestClient
 
-from apispec_starlette import add_swagger_json_endpoint
+from apispec_starlette import (
+    add_swagger_json_endpoint,
+    add_swagger_json_file_endpoint,
+    document_response,
+)
+from apispec_starlette._starlette import _preferred_encoding
 
 
 def test_default_swagger_json_endpoint():
@@ -103,3 +115,675 @@ def test_swagger_json_endpoint_with_x_forwarded_prefix_header():
         "paths": {},
         "swagger": "2.0",
     }
+
+
+def test_cached_swagger_json_endpoint_is_built_once():
+    app = Starlette()
+    spec = add_swagger_json_endpoint(app, cache=True)
+
+    @app.route("/test")
+    def test_endpoint(request):
+        pass  # pragma: no cover
+
+    client = TestClient(app)
+    first_response = client.get("/swagger.json")
+
+    @app.route("/test_added_after_build")
+    def test_endpoint_added_after_build(request):
+        pass  # pragma: no cover
+
+    response = client.get("/swagger.json")
+    assert response.content == first_response.content
+    assert response.headers["content-type"] == "application/json"
+    assert response.json() == {
+        "info": {"title": "My API", "version": "0.0.1"},
+        "paths": {"/test": {"get": {"operationId": "get_test_endpoint"}}},
+        "swagger": "2.0",
+    }
+
+    spec.invalidate()
+    response = client.get("/swagger.json")
+    assert response.json() == {
+        "info": {"title": "My API", "version": "0.0.1"},
+        "paths": {
+            "/test": {"get": {"operationId": "get_test_endpoint"}},
+            "/test_added_after_build": {
+                "get": {"operationId": "get_test_endpoint_added_after_build"}
+            },
+        },
+        "swagger": "2.0",
+    }
+
+
+def test_cached_swagger_json_endpoint_is_invalidated_by_documentation():
+    app = Starlette()
+    spec = add_swagger_json_endpoint(app, cache=True)
+
+    client = TestClient(app)
+    assert client.get("/swagger.json").json()["paths"] == {}
+
+    document_response(
+        spec,
+        endpoint="/test",
+        method="get",
+        status_code=200,
+        response={"description": "ok"},
+    )
+
+    assert client.get("/swagger.json").json()["paths"] == {
+        "/test": {"get": {"responses": {"200": {"description": "ok"}}}}
+    }
+
+
+class CountingExecutor(ThreadPoolExecutor):
+    def __init__(self):
+        super().__init__(max_workers=1)
+        self.submitted = 0
+        self.released = threading.Event()
+        self.released.set()
+
+    def submit(self, fn, *args, **kwargs):
+        self.submitted += 1
+
+        def wait_for_release():
+            self.released.wait()
+            return fn(*args, **kwargs)
+
+        return super().submit(wait_for_release)
+
+
+def test_swagger_json_endpoint_is_asynchronous():
+    app = Starlette()
+    executor = CountingExecutor()
+    add_swagger_json_endpoint(app, cache=True, executor=executor)
+
+    swagger_route = [route for route in app.routes if route.path == "/swagger.json"]
+    assert asyncio.iscoroutinefunction(swagger_route[0].endpoint)
+
+    client = TestClient(app)
+    client.get("/swagger.json")
+    client.get("/swagger.json")
+    # Second request is served from cache
+    assert executor.submitted == 1
+
+
+def test_concurrent_builds_are_shared(event_loop):
+    app = Starlette()
+    executor = CountingExecutor()
+    spec = add_swagger_json_endpoint(app, executor=executor)
+
+    @app.route("/test")
+    def test_endpoint(request):
+        pass  # pragma: no cover
+
+    async def fetch_concurrently():
+        executor.released.clear()
+        fetches = [
+            asyncio.ensure_future(spec.serialized_async(executor, refresh=True))
+            for _ in range(10)
+        ]
+        # Let every fetch start before the build can complete
+        await asyncio.sleep(0)
+        executor.released.set()
+        return await asyncio.gather(*fetches)
+
+    serialized = event_loop.run_until_complete(fetch_concurrently())
+    assert executor.submitted == 1
+    assert len(set(serialized)) == 1
+    assert json.loads(serialized[0].content)["paths"] == {
+        "/test": {"get": {"operationId": "get_test_endpoint"}}
+    }
+
+
+def test_refresh_does_not_block_event_loop(event_loop):
+    app = Starlette()
+    executor = CountingExecutor()
+    spec = add_swagger_json_endpoint(app, executor=executor)
+    locked = threading.Event()
+    released = threading.Event()
+
+    def hold_lock():
+        with spec.lock:
+            locked.set()
+            released.wait(timeout=5)
+
+    threading.Thread(target=hold_lock).start()
+    locked.wait()
+
+    async def fetch():
+        fetching = asyncio.ensure_future(spec.serialized_async(executor, refresh=True))
+        # Event loop is still running while the lock is held
+        await asyncio.sleep(0.01)
+        assert not released.is_set()
+        assert not fetching.done()
+        released.set()
+        return await fetching
+
+    assert json.loads(event_loop.run_until_complete(fetch()).content)["paths"] == {}
+
+
+def test_refresh_keeps_definition_if_nothing_was_documented():
+    app = Starlette()
+    spec = add_swagger_json_endpoint(app)
+
+    @app.route("/users")
+    def users_endpoint(request):
+        pass  # pragma: no cover
+
+    client = TestClient(app)
+    assert list(client.get("/swagger.json?paths=/users").json()["paths"]) == ["/users"]
+    snapshot = spec._snapshot
+    filtered = snapshot.filtered[(("/users",), (), (), None)]
+    assert list(client.get("/swagger.json?paths=/users").json()["paths"]) == ["/users"]
+    assert spec._snapshot is snapshot
+    assert snapshot.filtered[(("/users",), (), (), None)] is filtered
+
+    @app.route("/invoices")
+    def invoices_endpoint(request):
+        pass  # pragma: no cover
+
+    assert sorted(client.get("/swagger.json").json()["paths"]) == [
+        "/invoices",
+        "/users",
+    ]
+    assert spec._snapshot is not snapshot
+
+
+def test_x_forwarded_prefix_header_does_not_leak_to_other_requests():
+    app = Starlette()
+    add_swagger_json_endpoint(app, cache=True)
+
+    client = TestClient(app)
+    response = client.get("/swagger.json", headers={"X-Forwarded-Prefix": "/test"})
+    assert response.json()["basePath"] == "/test"
+    response = client.get("/swagger.json", headers={"X-Forwarded-Prefix": "/test2"})
+    assert response.json()["basePath"] == "/test2"
+    response = client.get("/swagger.json")
+    assert response.json() == {
+        "info": {"title": "My API", "version": "0.0.1"},
+        "paths": {},
+        "swagger": "2.0",
+    }
+
+
+def test_x_forwarded_prefix_header_does_not_override_base_path():
+    app = Starlette()
+    add_swagger_json_endpoint(app, basePath="/provided")
+
+    client = TestClient(app)
+    response = client.get("/swagger.json", headers={"X-Forwarded-Prefix": "/test"})
+    assert response.json()["basePath"] == "/provided"
+
+
+def test_base_path_variants_are_bounded():
+    app = Starlette()
+    spec = add_swagger_json_endpoint(app, max_base_path_variants=2)
+
+    assert json.loads(spec.content(base_path="/first"))["basePath"] == "/first"
+    assert json.loads(spec.content(base_path="/second"))["basePath"] == "/second"
+    # Use first one so that second one is the least recently used
+    spec.content(base_path="/first")
+    assert json.loads(spec.content(base_path="/third"))["basePath"] == "/third"
+    assert list(spec.serialized().variants) == ["/first", "/third"]
+
+
+def test_swagger_json_endpoint_etag():
+    app = Starlette()
+    add_swagger_json_endpoint(app, cache=True)
+
+    client = TestClient(app)
+    response = client.get("/swagger.json")
+    etag = response.headers["ETag"]
+    assert "Cache-Control" not in response.headers
+
+    response = client.get("/swagger.json", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+    assert response.content == b""
+
+    response = client.get(
+        "/swagger.json", headers={"If-None-Match": f'"other", W/{etag}'}
+    )
+    assert response.status_code == 304
+
+    response = client.get("/swagger.json", headers={"If-None-Match": "*"})
+    assert response.status_code == 304
+
+    response = client.get("/swagger.json", headers={"If-None-Match": '"other"'})
+    assert response.status_code == 200
+    assert response.json()["swagger"] == "2.0"
+
+
+def test_swagger_json_endpoint_etag_depends_on_content():
+    app = Starlette()
+    add_swagger_json_endpoint(app, cache=True)
+
+    client = TestClient(app)
+    etag = client.get("/swagger.json").headers["ETag"]
+
+    response = client.get(
+        "/swagger.json", headers={"If-None-Match": etag, "X-Forwarded-Prefix": "/test"}
+    )
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+
+def test_swagger_json_endpoint_cache_control():
+    app = Starlette()
+    add_swagger_json_endpoint(app, cache_control="public, max-age=60")
+
+    client = TestClient(app)
+    response = client.get("/swagger.json")
+    assert response.headers["Cache-Control"] == "public, max-age=60"
+
+
+def test_swagger_json_endpoint_compression():
+    app = Starlette()
+    add_swagger_json_endpoint(app, compress=True)
+
+    client = TestClient(app)
+    response = client.get("/swagger.json", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.headers["Vary"] == "Accept-Encoding"
+    assert response.json()["swagger"] == "2.0"
+    gzip_etag = response.headers["ETag"]
+
+    response = client.get("/swagger.json", headers={"Accept-Encoding": "identity"})
+    assert "Content-Encoding" not in response.headers
+    assert response.headers["Vary"] == "Accept-Encoding"
+    assert response.headers["ETag"] != gzip_etag
+    assert response.json()["swagger"] == "2.0"
+
+    response = client.get(
+        "/swagger.json",
+        headers={"Accept-Encoding": "gzip", "If-None-Match": gzip_etag},
+    )
+    assert response.status_code == 304
+    assert "Content-Encoding" not in response.headers
+
+
+def test_swagger_json_endpoint_compresses_on_first_accepting_request():
+    app = Starlette()
+    spec = add_swagger_json_endpoint(app, cache=True, compress=True)
+
+    client = TestClient(app)
+    client.get("/swagger.json", headers={"Accept-Encoding": "identity"})
+    assert spec.serialized().encoded == {}
+
+    response = client.get("/swagger.json", headers={"Accept-Encoding": "gzip"})
+    assert response.json()["swagger"] == "2.0"
+    assert list(spec.serialized().encoded) == ["gzip"]
+
+    # Base path variants are compressed on their own
+    response = client.get(
+        "/swagger.json",
+        headers={"Accept-Encoding": "gzip", "X-Forwarded-Prefix": "/prefix"},
+    )
+    assert response.json()["basePath"] == "/prefix"
+    variant = spec.serialized().variants["/prefix"]
+    assert list(variant.encoded) == ["gzip"]
+    assert variant.compressed("gzip") is variant.encoded["gzip"]
+
+
+def test_swagger_json_endpoint_without_compression():
+    app = Starlette()
+    add_swagger_json_endpoint(app)
+
+    client = TestClient(app)
+    response = client.get("/swagger.json", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in response.headers
+    assert "Vary" not in response.headers
+
+
+def test_preferred_encoding():
+    assert _preferred_encoding("gzip, deflate, br", ("br", "gzip")) == "br"
+    assert _preferred_encoding("gzip;q=1.0, br;q=0.5", ("br", "gzip")) == "gzip"
+    assert _preferred_encoding("gzip;q=0", ("br", "gzip")) is None
+    assert _preferred_encoding("*", ("br", "gzip")) == "br"
+    assert _preferred_encoding("gzip;q=invalid", ("gzip",)) is None
+    assert _preferred_encoding("", ("gzip",)) is None
+
+
+def test_swagger_json_file_endpoint(tmp_path):
+    file_path = tmp_path / "swagger.json"
+    file_path.write_bytes(b'{"info":{"title":"Prebuilt","version":"1.0.0"}}')
+
+    app = Starlette()
+    add_swagger_json_file_endpoint(
+        app, str(file_path), cache_control="max-age=3600", compress=True
+    )
+
+    client = TestClient(app)
+    response = client.get("/swagger.json", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.headers["Cache-Control"] == "max-age=3600"
+    assert response.headers["content-type"] == "application/json"
+    assert response.json() == {"info": {"title": "Prebuilt", "version": "1.0.0"}}
+
+    response = client.get(
+        "/swagger.json",
+        headers={
+            "Accept-Encoding": "identity",
+            "If-None-Match": response.headers["ETag"],
+        },
+    )
+    assert response.status_code == 200
+    assert response.content == b'{"info":{"title":"Prebuilt","version":"1.0.0"}}'
+
+    response = client.get(
+        "/swagger.json",
+        headers={
+            "Accept-Encoding": "identity",
+            "If-None-Match": response.headers["ETag"],
+        },
+    )
+    assert response.status_code == 304
+
+
+def test_streamed_swagger_json_endpoint():
+    app = Starlette()
+    spec = add_swagger_json_endpoint(app, stream=True, cache_control="no-cache")
+
+    @app.route("/test")
+    def test_endpoint(request):
+        """
+        responses:
+            200:
+                description: "ok"
+        """
+        pass  # pragma: no cover
+
+    client = TestClient(app)
+    response = client.get("/swagger.json", headers={"X-Forwarded-Prefix": "/test"})
+    assert response.headers["content-type"] == "application/json"
+    assert response.headers["Cache-Control"] == "no-cache"
+    assert "ETag" not in response.headers
+    assert response.content == spec.content(base_path="/test")
+    assert response.json() == {
+        "info": {"title": "My API", "version": "0.0.1"},
+        "paths": {
+            "/test": {
+                "get": {
+                    "operationId": "get_test_endpoint",
+                    "responses": {"200": {"description": "ok"}},
+                }
+            }
+        },
+        "swagger": "2.0",
+        "basePath": "/test",
+    }
+
+
+def test_streamed_chunks_are_encoded_within_executor():
+    app = Starlette()
+    executor = CountingExecutor()
+    spec = add_swagger_json_endpoint(app, cache=True, executor=executor, stream=True)
+
+    def test_endpoint(request):
+        pass  # pragma: no cover
+
+    for index in range(3):
+        app.add_route(f"/test{index}", test_endpoint)
+
+    client = TestClient(app)
+    spec.document()
+    response = client.get("/swagger.json")
+    assert response.json()["paths"].keys() == {"/test0", "/test1", "/test2"}
+    # Document was already built, a single chunk is encoded and then the end of chunks is reached
+    assert executor.submitted == 2
+
+
+def test_concurrent_document_builds_are_shared(event_loop):
+    app = Starlette()
+    executor = CountingExecutor()
+    spec = add_swagger_json_endpoint(app, executor=executor, stream=True)
+
+    async def fetch_concurrently():
+        executor.released.clear()
+        fetches = [
+            asyncio.ensure_future(spec.document_async(executor)) for _ in range(10)
+        ]
+        await asyncio.sleep(0)
+        executor.released.set()
+        return await asyncio.gather(*fetches)
+
+    documents = event_loop.run_until_complete(fetch_concurrently())
+    assert executor.submitted == 1
+    assert all(document is documents[0] for document in documents)
+    # Already built
+    assert event_loop.run_until_complete(spec.document_async(executor)) is documents[0]
+    assert executor.submitted == 1
+
+
+@pytest.fixture
+def event_loop():
+    # TestClient runs startup handlers within the current event loop
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    yield loop
+    asyncio.set_event_loop(None)
+    loop.close()
+
+
+def test_swagger_json_endpoint_prewarmed_on_startup(event_loop):
+    app = Starlette()
+    executor = CountingExecutor()
+    spec = add_swagger_json_endpoint(
+        app, cache=True, executor=executor, prewarm="blocking"
+    )
+
+    @app.route("/test")
+    def test_endpoint(request):
+        pass  # pragma: no cover
+
+    with TestClient(app) as client:
+        # Built before serving any request
+        assert executor.submitted == 1
+        assert spec._snapshot.serialized is not None
+        assert client.get("/swagger.json").json()["paths"] == {
+            "/test": {"get": {"operationId": "get_test_endpoint"}}
+        }
+    assert executor.submitted == 1
+
+
+def test_swagger_json_endpoint_prewarmed_in_background(event_loop):
+    app = Starlette()
+    executor = CountingExecutor()
+    executor.released.clear()
+    spec = add_swagger_json_endpoint(
+        app, cache=True, executor=executor, prewarm="background"
+    )
+
+    with TestClient(app) as client:
+        # Startup is not waiting for the build
+        assert executor.submitted == 1
+        assert spec._snapshot.serialized is None
+        executor.released.set()
+        # Request is sharing the in-flight build
+        assert client.get("/swagger.json").status_code == 200
+    assert executor.submitted == 1
+
+
+def test_streamed_swagger_json_endpoint_prewarmed_on_startup(event_loop):
+    app = Starlette()
+    spec = add_swagger_json_endpoint(app, cache=True, stream=True, prewarm="blocking")
+
+    with TestClient(app):
+        assert spec._snapshot.document is not None
+        assert spec._snapshot.serialized is None
+
+
+def test_swagger_json_endpoint_prewarm_without_cache():
+    with pytest.raises(ValueError) as exception_info:
+        add_swagger_json_endpoint(Starlette(), prewarm="blocking")
+    assert str(exception_info.value) == "prewarm can only be used with cache."
+
+
+def test_swagger_json_endpoint_invalid_prewarm():
+    with pytest.raises(ValueError) as exception_info:
+        add_swagger_json_endpoint(Starlette(), cache=True, prewarm="lazy")
+    assert (
+        str(exception_info.value)
+        == "lazy is not a valid prewarm value. Valid values are blocking and background."
+    )
+
+
+def test_openapi_json_endpoint():
+    app = Starlette()
+    executor = CountingExecutor()
+    spec = add_swagger_json_endpoint(
+        app, cache=True, executor=executor, openapi_json=True
+    )
+    built_documents = []
+    build_document = spec.to_dict
+
+    def to_dict():
+        built_documents.append(build_document())
+        return built_documents[-1]
+
+    spec.to_dict = to_dict
+
+    @app.route("/test")
+    def test_endpoint(request):
+        """
+        responses:
+            200:
+                description: "ok"
+                schema:
+                    type: string
+        """
+        pass  # pragma: no cover
+
+    client = TestClient(app)
+    response = client.get("/openapi.json")
+    assert response.json() == {
+        "openapi": "3.0.2",
+        "info": {"title": "My API", "version": "0.0.1"},
+        "paths": {
+            "/test": {
+                "get": {
+                    "operationId": "get_test_endpoint",
+                    "responses": {
+                        "200": {
+                            "description": "ok",
+                            "content": {
+                                "application/json": {"schema": {"type": "string"}}
+                            },
+                        }
+                    },
+                }
+            }
+        },
+    }
+    assert response.headers["ETag"]
+    assert client.get("/swagger.json").json()["swagger"] == "2.0"
+    # Both definitions are rendered from a single build
+    assert len(built_documents) == 1
+
+    response = client.get("/openapi.json", headers={"X-Forwarded-Prefix": "/api"})
+    assert response.json()["servers"] == [{"url": "/api"}]
+    assert "servers" not in client.get("/openapi.json").json()
+    assert spec.openapi3() is spec.openapi3()
+
+
+def test_x_forwarded_prefix_header_does_not_override_servers():
+    app = Starlette()
+    add_swagger_json_endpoint(app, openapi_json=True, host="example.com")
+
+    client = TestClient(app)
+    response = client.get("/openapi.json", headers={"X-Forwarded-Prefix": "/api"})
+    assert response.json()["servers"] == [{"url": "http://example.com"}]
+
+
+def test_swagger_shard_endpoints():
+    app = Starlette()
+    add_swagger_json_endpoint(app, cache=True, shards="mount")
+
+    def test_endpoint(request):
+        pass  # pragma: no cover
+
+    app.routes.append(Mount("/sub", routes=[Route("/test", test_endpoint)]))
+
+    client = TestClient(app)
+    assert client.get("/swagger/index.json").json() == {
+        "shards": [{"name": "sub", "url": "sub.json", "paths": 1}]
+    }
+    response = client.get("/swagger/sub.json")
+    assert response.json()["paths"] == {
+        "/sub/test": {"get": {"operationId": "get_test_endpoint"}}
+    }
+    etag = response.headers["ETag"]
+    assert (
+        client.get("/swagger/sub.json", headers={"If-None-Match": etag}).status_code
+        == 304
+    )
+    assert client.get("/swagger/unknown.json").status_code == 404
+    # Full definition is still available
+    assert "/sub/test" in client.get("/swagger.json").json()["paths"]
+
+
+def test_swagger_shard_endpoint_named_index():
+    app = Starlette()
+    add_swagger_json_endpoint(app, cache=True, shards="mount")
+
+    def test_endpoint(request):
+        pass  # pragma: no cover
+
+    app.routes.append(Mount("/index", routes=[Route("/test", test_endpoint)]))
+
+    client = TestClient(app)
+    assert client.get("/swagger/index.json").json() == {
+        "shards": [{"name": "index_", "url": "index_.json", "paths": 1}]
+    }
+    assert list(client.get("/swagger/index_.json").json()["paths"]) == ["/index/test"]
+
+
+def test_swagger_shard_endpoints_invalid_kind():
+    app = Starlette()
+    with pytest.raises(ValueError) as exception_info:
+        add_swagger_json_endpoint(app, shards="path")
+    assert (
+        str(exception_info.value)
+        == "path is not a valid kind of shard. Valid values are mount and tag."
+    )
+    # Application is left untouched
+    assert app.routes == []
+
+
+def test_filtered_swagger_json_endpoint_keeps_most_recently_used():
+    app = Starlette()
+    spec = add_swagger_json_endpoint(app, cache=True, max_filtered_definitions=2)
+
+    client = TestClient(app)
+    for tag in ("first", "second", "first", "third"):
+        client.get(f"/swagger.json?tags={tag}")
+    assert [key[1] for key in spec._snapshot.filtered] == [("first",), ("third",)]
+
+
+def test_filtered_swagger_json_endpoint():
+    app = Starlette()
+    spec = add_swagger_json_endpoint(app, cache=True)
+
+    @app.route("/users", methods=["GET", "POST"])
+    def users_endpoint(request):
+        pass  # pragma: no cover
+
+    @app.route("/invoices")
+    def invoices_endpoint(request):
+        pass  # pragma: no cover
+
+    client = TestClient(app)
+    response = client.get("/swagger.json?paths=/users*&methods=post")
+    assert response.json()["paths"] == {
+        "/users": {"post": {"operationId": "post_users_endpoint"}}
+    }
+    response = client.get(
+        "/swagger.json?paths=/users,/invoices&methods=get",
+        headers={"X-Forwarded-Prefix": "/api"},
+    )
+    assert response.json()["basePath"] == "/api"
+    assert sorted(response.json()["paths"]) == ["/invoices", "/users"]
+    assert client.get("/swagger.json?tags=unknown").json()["paths"] == {}
+    assert len(spec._snapshot.filtered) == 3
+    # Unfiltered definition
+    assert len(client.get("/swagger.json").json()["paths"]) == 2